@@ -2,16 +2,38 @@ import sqlite3
 import random
 import os
 import time
+from pathlib import Path
 from typing import List, Dict, Set
 from main import User, FinancialFund, Order, Customer, PermissionService
 
+def shared_cache_uri(db_path):
+    """Build a URI that opens db_path in shared-cache mode, so connections in
+    this process share one page cache instead of each warming its own"""
+    return Path(db_path).absolute().as_uri() + "?cache=shared"
+
 class DatabasePermissionService(PermissionService):
     """Database-backed implementation of PermissionService"""
     
-    def __init__(self, db_path="finance_system.db"):
+    def __init__(self, db_path="finance_system.db", conn=None):
         self.db_path = db_path
+        # Optional shared connection; when set, read paths reuse it instead of
+        # opening (and cold-starting the page cache of) a new connection per call
+        self.conn = conn
         self.setup_database()
         # We don't call the parent's __init__ as we're replacing its functionality
+    
+    def _connect(self):
+        """Return the shared connection if one was injected, else a new one"""
+        if self.conn is not None:
+            return self.conn
+        return sqlite3.connect(shared_cache_uri(self.db_path), uri=True)
+    
+    def _release(self, conn):
+        """Close a per-call connection; end the open transaction on a shared one"""
+        if conn is self.conn:
+            conn.commit()
+        else:
+            conn.close()
         
     def setup_database(self):
         """Create database tables if they don't exist"""
@@ -298,13 +320,13 @@ class DatabasePermissionService(PermissionService):
     
     def get_user(self, user_id):
         """Get a user by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT id, name, role, department, parent_id FROM users WHERE id = ?", (user_id,))
         user_data = cursor.fetchone()
         
-        conn.close()
+        self._release(conn)
         
         if user_data:
             return User(user_data[0], user_data[1], user_data[2], user_data[3], user_data[4])
@@ -312,13 +334,13 @@ class DatabasePermissionService(PermissionService):
     
     def get_users(self):
         """Get all users"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT id, name, role, department, parent_id FROM users")
         users_data = cursor.fetchall()
         
-        conn.close()
+        self._release(conn)
         
         users = {}
         for user_data in users_data:
@@ -328,7 +350,7 @@ class DatabasePermissionService(PermissionService):
     
     def get_subordinates(self, user_id: int) -> Set[int]:
         """递归获取所有下属ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # For performance, limit depth of recursion and total result size
@@ -349,7 +371,7 @@ class DatabasePermissionService(PermissionService):
         # Always include the user themselves
         subordinates.add(user_id)
         
-        conn.close()
+        self._release(conn)
         return subordinates
     
     def _get_subordinates_recursive(self, user_id):
@@ -357,7 +379,7 @@ class DatabasePermissionService(PermissionService):
         This function is no longer used due to potential issues with large result sets.
         Using direct CTE query in get_subordinates instead.
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Use a CTE (Common Table Expression) for recursive lookup
@@ -372,12 +394,12 @@ class DatabasePermissionService(PermissionService):
         ''', (user_id,))
         
         result = cursor.fetchone()[0]
-        conn.close()
+        self._release(conn)
         return result
     
     def get_accessible_data_scope(self, user: User) -> Dict:
         """获取数据权限范围"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         scope = {"handle_by": set(), "order_ids": set(), "customer_ids": set()}
@@ -445,7 +467,7 @@ class DatabasePermissionService(PermissionService):
             cursor.execute("SELECT customer_id FROM customers WHERE admin_user_id = ? LIMIT 10000", (user.id,))
             scope["customer_ids"] = {row[0] for row in cursor.fetchall()}
         
-        conn.close()
+        self._release(conn)
         return scope
 
 class DatabaseFinancialService:
@@ -457,24 +479,38 @@ class DatabaseFinancialService:
     
     def get_funds(self, user: User) -> List[FinancialFund]:
         """获取财务列表"""
+        return [FinancialFund(*row) for row in self._iter_fund_rows(user)]
+    
+    def count_funds(self, user: User) -> int:
+        """Count the funds get_funds would return without building FinancialFund objects"""
+        return sum(1 for _ in self._iter_fund_rows(user))
+    
+    def _iter_fund_rows(self, user: User):
+        """Yield the unique fund rows visible to user, in fund_id order (at most 1000)"""
         scope = self.permission_svc.get_accessible_data_scope(user)
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.permission_svc._connect()
         cursor = conn.cursor()
+        cursor.arraysize = 4096
         # Check if user is admin for special case handling
         is_admin = scope.get("is_admin", False)
         
         # Use query hints to optimize execution plan
         conn.execute("PRAGMA optimize")
         
-        filtered_funds = []
         max_vars = 500  # SQLite typically allows 999 variables, we use 500 to be safe
         
         if is_admin:
-            # For admin, just get a sample of funds directly without filtering
-            # Add an index hint for better performance
-            cursor.execute("SELECT fund_id, handle_by, order_id, customer_id, amount FROM financial_funds INDEXED BY idx_funds_handle_by LIMIT 1000")
-            all_results = cursor.fetchall()
+            # For admin, just get a sample of funds directly without filtering.
+            # fund_id is the rowid, so this is an ordered scan that stops after
+            # 1000 unique rows and each batch can be yielded as it is fetched
+            try:
+                cursor.execute("SELECT fund_id, handle_by, order_id, customer_id, amount FROM financial_funds ORDER BY fund_id LIMIT 1000")
+                while batch := cursor.fetchmany():
+                    yield from batch
+            finally:
+                self.permission_svc._release(conn)
+            return
         else:
             # Chunked query execution function
             def execute_chunked_query(field_name, id_list, max_chunk_size):
@@ -506,8 +542,9 @@ class DatabaseFinancialService:
             if len(all_results) < 1000 and customer_ids_list:
                 all_results.extend(execute_chunked_query("customer_id", customer_ids_list, max_vars))
         
-        # Convert results to FinancialFund objects - limit to 1000 funds
-        # For better performance with large result sets
+        self.permission_svc._release(conn)
+        
+        # Limit to 1000 funds for better performance with large result sets
         seen_ids = set()  # Track already processed fund_ids to avoid duplicates
         
         # Sort results by fund_id to get consistent results (better for caching)
@@ -517,26 +554,22 @@ class DatabaseFinancialService:
         for row in all_results[:2000]:
             fund_id = row[0]
             if fund_id not in seen_ids:
-                fund = FinancialFund(fund_id, row[1], row[2], row[3], row[4])
-                filtered_funds.append(fund)
+                yield row
                 seen_ids.add(fund_id)
-                if len(filtered_funds) >= 1000:  # Ensure we don't exceed 1000 results
+                if len(seen_ids) >= 1000:  # Ensure we don't exceed 1000 results
                     break
-        
-        conn.close()
-        return filtered_funds
 
 class DatabaseApiGateway:
     """Database-backed implementation of ApiGateway"""
     
-    def __init__(self, db_path="finance_system.db"):
-        self.permission_svc = DatabasePermissionService(db_path)
+    def __init__(self, db_path="finance_system.db", conn=None):
+        self.permission_svc = DatabasePermissionService(db_path, conn)
         self.financial_svc = DatabaseFinancialService(self.permission_svc)
         self.current_user = None
     
     def authenticate(self, role: str):
         """模拟用户认证"""
-        conn = sqlite3.connect(self.permission_svc.db_path)
+        conn = self.permission_svc._connect()
         cursor = conn.cursor()
         
         # First try to get one of the original test users with this role (IDs 1-4)
@@ -548,17 +581,17 @@ class DatabaseApiGateway:
             cursor.execute("SELECT id, name, role, department, parent_id FROM users WHERE role = ? LIMIT 1", (role,))
             user_data = cursor.fetchone()
         
-        conn.close()
+        self.permission_svc._release(conn)
         
         if user_data:
             self.current_user = User(user_data[0], user_data[1], user_data[2], user_data[3], user_data[4])
         else:
             # Default to admin (user ID 1)
-            conn = sqlite3.connect(self.permission_svc.db_path)
+            conn = self.permission_svc._connect()
             cursor = conn.cursor()
             cursor.execute("SELECT id, name, role, department, parent_id FROM users WHERE id = 1")
             user_data = cursor.fetchone()
-            conn.close()
+            self.permission_svc._release(conn)
             self.current_user = User(user_data[0], user_data[1], user_data[2], user_data[3], user_data[4])
     
     def get_funds(self):
@@ -567,6 +600,13 @@ class DatabaseApiGateway:
             raise Exception("请先登录")
         
         return self.financial_svc.get_funds(self.current_user)
+    
+    def count_funds(self):
+        """Count the funds get_funds would return, without materializing them"""
+        if not self.current_user:
+            raise Exception("请先登录")
+        
+        return self.financial_svc.count_funds(self.current_user)
 
 def measure_performance(test_name, func, *args, **kwargs):
     """Measure and print the performance of a function"""
@@ -15,6 +15,7 @@ import os
 import sys
 import time
 import mysql.connector
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from typing import Dict, List, Optional
 import logging
@@ -171,28 +172,41 @@ class IndexConstraintManager:
         cursor = conn.cursor()
         
         try:
-            dropped_count = 0
+            # Look up which of the indexes exist in one query
+            placeholders = ', '.join(['%s'] * len(indexes_to_drop))
+            cursor.execute(
+                f"SELECT DISTINCT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS "
+                f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+                f"AND INDEX_NAME IN ({placeholders})",
+                (self.table_name, *indexes_to_drop)
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            
             for index_name in indexes_to_drop:
+                if index_name not in existing:
+                    logger.info(f"  Index {index_name} does not exist, skipping")
+            
+            to_drop = [name for name in indexes_to_drop if name in existing]
+            dropped_count = 0
+            
+            if to_drop:
+                # DDL commits implicitly in MySQL, so batch every drop into a
+                # single ALTER TABLE instead of one commit per DROP INDEX
+                drop_clauses = ', '.join(f"DROP INDEX {name}" for name in to_drop)
                 try:
-                    # Check if index exists first
-                    cursor.execute(
-                        "SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS "
-                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
-                        "AND INDEX_NAME = %s LIMIT 1",
-                        (self.table_name, index_name)
-                    )
-                    
-                    if cursor.fetchone():
-                        # Index exists, drop it
-                        drop_sql = f"DROP INDEX {index_name} ON {self.table_name}"
-                        cursor.execute(drop_sql)
+                    cursor.execute(f"ALTER TABLE {self.table_name} {drop_clauses}")
+                    for index_name in to_drop:
                         logger.info(f"  Dropped index: {index_name}")
-                        dropped_count += 1
-                    else:
-                        logger.info(f"  Index {index_name} does not exist, skipping")
-                        
+                    dropped_count = len(to_drop)
                 except mysql.connector.Error as e:
-                    logger.warning(f"  Failed to drop index {index_name}: {e}")
+                    logger.warning(f"  Batched drop failed ({e}), dropping indexes one by one")
+                    for index_name in to_drop:
+                        try:
+                            cursor.execute(f"DROP INDEX {index_name} ON {self.table_name}")
+                            logger.info(f"  Dropped index: {index_name}")
+                            dropped_count += 1
+                        except mysql.connector.Error as e:
+                            logger.warning(f"  Failed to drop index {index_name}: {e}")
             
             logger.info(f"Successfully dropped {dropped_count} indexes")
             return True
@@ -266,6 +280,18 @@ class IndexConstraintManager:
                     logger.info("  Enabled parallel read threads for MySQL 8.0+")
                 except mysql.connector.Error as e:
                     logger.warning(f"  Failed to set parallel threads: {e}")
+            
+            # Pin persistent statistics and stop automatic recalculation while
+            # indexes are built; _finalize_stats() runs one ANALYZE at the end
+            # and then restores STATS_AUTO_RECALC
+            try:
+                cursor.execute(
+                    f"ALTER TABLE {self.table_name} "
+                    f"STATS_PERSISTENT = 1, STATS_AUTO_RECALC = 0"
+                )
+                logger.info("  Enabled persistent statistics, disabled auto recalc")
+            except mysql.connector.Error as e:
+                logger.warning(f"  Failed to set statistics options: {e}")
                     
         except Exception as e:
             logger.error(f"Failed to configure index creation settings: {e}")
@@ -283,35 +309,42 @@ class IndexConstraintManager:
         try:
             success_count = 0
             
-            # Required Index 1: btree (supervisor_id, permission_type, fund_id)
-            logger.info("Creating primary composite index: (supervisor_id, permission_type, fund_id)")
-            try:
-                cursor.execute(
-                    f"CREATE INDEX idx_supervisor_perm_fund "
-                    f"ON {self.table_name} (supervisor_id, permission_type, fund_id) "
-                    f"USING BTREE "
-                    f"COMMENT 'Primary composite index for supervisor permission queries'"
-                )
-                logger.info("  ✅ Created idx_supervisor_perm_fund")
-                success_count += 1
-            except mysql.connector.Error as e:
-                logger.error(f"  ❌ Failed to create idx_supervisor_perm_fund: {e}")
+            required_indexes = [
+                {
+                    # Required Index 1: btree (supervisor_id, permission_type, fund_id)
+                    'name': 'idx_supervisor_perm_fund',
+                    'clause': "ADD INDEX idx_supervisor_perm_fund (supervisor_id, permission_type, fund_id) USING BTREE COMMENT 'Primary composite index for supervisor permission queries'",
+                    'description': 'primary composite index: (supervisor_id, permission_type, fund_id)'
+                },
+                {
+                    # Required Index 2: btree (fund_id) for fast revoke cascade
+                    'name': 'idx_fund_revoke_cascade',
+                    'clause': "ADD INDEX idx_fund_revoke_cascade (fund_id) USING BTREE COMMENT 'Fast revoke cascade index on fund_id'",
+                    'description': 'fund_id index for fast revoke cascade'
+                }
+            ]
             
-            # Required Index 2: btree (fund_id) for fast revoke cascade
-            logger.info("Creating fund_id index for fast revoke cascade")
+            # Both required indexes are built by one ALTER TABLE: one pass over the
+            # table and a single implicit commit instead of one per index
+            add_clauses = ', '.join(idx['clause'] for idx in required_indexes)
+            logger.info("Creating " + ' and '.join(idx['description'] for idx in required_indexes))
             try:
-                cursor.execute(
-                    f"CREATE INDEX idx_fund_revoke_cascade "
-                    f"ON {self.table_name} (fund_id) "
-                    f"USING BTREE "
-                    f"COMMENT 'Fast revoke cascade index on fund_id'"
-                )
-                logger.info("  ✅ Created idx_fund_revoke_cascade")
-                success_count += 1
+                cursor.execute(f"ALTER TABLE {self.table_name} {add_clauses}")
+                for idx in required_indexes:
+                    logger.info(f"  ✅ Created {idx['name']}")
+                success_count = len(required_indexes)
             except mysql.connector.Error as e:
-                logger.error(f"  ❌ Failed to create idx_fund_revoke_cascade: {e}")
-            
-            return success_count == 2
+                logger.warning(f"  Batched index creation failed ({e}), creating indexes one by one")
+                for idx in required_indexes:
+                    logger.info(f"Creating {idx['description']}")
+                    try:
+                        cursor.execute(f"ALTER TABLE {self.table_name} {idx['clause']}")
+                        logger.info(f"  ✅ Created {idx['name']}")
+                        success_count += 1
+                    except mysql.connector.Error as e:
+                        logger.error(f"  ❌ Failed to create {idx['name']}: {e}")
+            
+            return success_count == len(required_indexes)
             
         except Exception as e:
             logger.error(f"Failed to create required indexes: {e}")
@@ -330,17 +363,17 @@ class IndexConstraintManager:
         additional_indexes = [
             {
                 'name': 'idx_permission_type',
-                'definition': f"CREATE INDEX idx_permission_type ON {self.table_name} (permission_type) USING BTREE COMMENT 'Permission type filtering index'",
+                'clause': "ADD INDEX idx_permission_type (permission_type) USING BTREE COMMENT 'Permission type filtering index'",
                 'description': 'Permission type filtering'
             },
             {
                 'name': 'idx_supervisor_amount',
-                'definition': f"CREATE INDEX idx_supervisor_amount ON {self.table_name} (supervisor_id, amount DESC) USING BTREE COMMENT 'Supervisor financial analysis index'",
+                'clause': "ADD INDEX idx_supervisor_amount (supervisor_id, amount DESC) USING BTREE COMMENT 'Supervisor financial analysis index'",
                 'description': 'Supervisor financial analysis'
             },
             {
                 'name': 'idx_last_updated',
-                'definition': f"CREATE INDEX idx_last_updated ON {self.table_name} (last_updated) USING BTREE COMMENT 'Incremental refresh timestamp index'",
+                'clause': "ADD INDEX idx_last_updated (last_updated) USING BTREE COMMENT 'Incremental refresh timestamp index'",
                 'description': 'Incremental refresh timestamp'
             }
         ]
@@ -348,14 +381,25 @@ class IndexConstraintManager:
         try:
             success_count = 0
             
-            for idx in additional_indexes:
-                logger.info(f"Creating {idx['description']} index")
-                try:
-                    cursor.execute(idx['definition'])
+            # Build all additional indexes with one ALTER TABLE so the batch
+            # is a single DDL statement (and a single implicit commit)
+            add_clauses = ', '.join(idx['clause'] for idx in additional_indexes)
+            logger.info("Creating " + ', '.join(idx['description'] for idx in additional_indexes) + " indexes")
+            try:
+                cursor.execute(f"ALTER TABLE {self.table_name} {add_clauses}")
+                for idx in additional_indexes:
                     logger.info(f"  ✅ Created {idx['name']}")
-                    success_count += 1
-                except mysql.connector.Error as e:
-                    logger.error(f"  ❌ Failed to create {idx['name']}: {e}")
+                success_count = len(additional_indexes)
+            except mysql.connector.Error as e:
+                logger.warning(f"  Batched index creation failed ({e}), creating indexes one by one")
+                for idx in additional_indexes:
+                    logger.info(f"Creating {idx['description']} index")
+                    try:
+                        cursor.execute(f"ALTER TABLE {self.table_name} {idx['clause']}")
+                        logger.info(f"  ✅ Created {idx['name']}")
+                        success_count += 1
+                    except mysql.connector.Error as e:
+                        logger.error(f"  ❌ Failed to create {idx['name']}: {e}")
             
             return success_count
             
@@ -366,9 +410,44 @@ class IndexConstraintManager:
             cursor.close()
             conn.close()
     
+    def _finalize_stats(self) -> None:
+        """Refresh index statistics once after all indexes are built, then re-enable auto recalc"""
+        logger.info("Phase 2D: Refreshing table statistics...")
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f"ANALYZE TABLE {self.table_name}")
+            cursor.fetchall()
+            logger.info(f"  Analyzed {self.table_name}")
+            
+            # Histograms are available from MySQL 8.0
+            if self.mysql_version and self.mysql_version['major'] >= 8:
+                cursor.execute(
+                    f"ANALYZE TABLE {self.table_name} "
+                    f"UPDATE HISTOGRAM ON supervisor_id, permission_type, fund_id "
+                    f"WITH 1024 BUCKETS"
+                )
+                cursor.fetchall()
+                logger.info("  Updated histograms on supervisor_id, permission_type, fund_id")
+                
+        except mysql.connector.Error as e:
+            logger.warning(f"  Failed to refresh statistics: {e}")
+        
+        # Hand statistics maintenance back to the server so plans track later data changes
+        try:
+            cursor.execute(f"ALTER TABLE {self.table_name} STATS_AUTO_RECALC = DEFAULT")
+            logger.info("  Restored automatic statistics recalculation")
+        except mysql.connector.Error as e:
+            logger.warning(f"  Failed to restore statistics options: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+    
     def verify_index_creation(self) -> Dict:
         """Verify all indexes were created successfully"""
-        logger.info("Phase 2D: Verifying index creation...")
+        logger.info("Phase 2E: Verifying index creation...")
         
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -437,7 +516,7 @@ class IndexConstraintManager:
     
     def test_index_performance(self) -> Dict:
         """Test index performance with sample queries"""
-        logger.info("Phase 2E: Testing index performance...")
+        logger.info("Phase 2F: Testing index performance...")
         
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -566,6 +645,39 @@ class IndexConstraintManager:
             cursor.close()
             conn.close()
     
+    def _run_post_load_check(self, name: str, func) -> Dict:
+        """Run one post-load check, turning a failure into an error result"""
+        try:
+            return func()
+        except Exception as e:
+            logger.error(f"Post-load check {name} failed: {e}")
+            return {'error': str(e)}
+        finally:
+            logger.info(f"  Post-load check {name} finished")
+    
+    def run_post_load_checks(self) -> Dict[str, Dict]:
+        """Run verification and statistics in parallel, then the performance test alone
+        
+        The metadata checks are read-only and can overlap; the performance test
+        reports query timings, so it runs afterwards without competing load.
+        """
+        checks = {
+            'verify': self.verify_index_creation,
+            'stats': self.get_table_statistics
+        }
+        results = {}
+        
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            future_to_check = {executor.submit(self._run_post_load_check, name, func): name
+                               for name, func in checks.items()}
+            
+            for future in as_completed(future_to_check):
+                name = future_to_check[future]
+                results[name] = future.result()
+        
+        results['test'] = self._run_post_load_check('test', self.test_index_performance)
+        return results
+    
     def execute_pre_load_phase(self) -> bool:
         """Execute complete pre-load phase"""
         logger.info("=== Starting Pre-Load Phase ===\n")
@@ -621,8 +733,15 @@ class IndexConstraintManager:
             perf_count = self.create_performance_indexes()
             logger.info(f"Created {perf_count} additional performance indexes")
             
-            # Verify creation
-            verification = self.verify_index_creation()
+            # Single statistics refresh instead of recomputing on every read
+            self._finalize_stats()
+            
+            # Verify and gather statistics concurrently - both are read-only and
+            # each opens its own connection, so their INFORMATION_SCHEMA round
+            # trips can overlap; the timed performance test runs alone afterwards
+            results = self.run_post_load_checks()
+            
+            verification = results['verify']
             if 'error' in verification:
                 logger.error("Index verification failed")
                 return False
@@ -631,16 +750,12 @@ class IndexConstraintManager:
                 logger.error("Not all required indexes are present")
                 return False
             
-            # Test performance
-            test_results = self.test_index_performance()
+            test_results = results['test']
             if 'error' not in test_results:
                 logger.info("Performance test results:")
                 for test_name, result in test_results.items():
                     logger.info(f"  {test_name}: {result['execution_time_ms']}ms ({result['result_count']} rows)")
             
-            # Get final statistics
-            stats = self.get_table_statistics()
-            
             logger.info("\n✅ Post-load phase completed successfully!")
             logger.info("All required indexes have been created and verified.\n")
             return True
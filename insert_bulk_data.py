@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 import os
 import time
-import random
+import csv
 import argparse
+import itertools
+import tempfile
+import numpy as np
 import mysql.connector
+from mysql.connector import pooling
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -15,182 +20,408 @@ config = {
     'port': int(os.getenv('DB_PORT_V2', '3306')),
     'user': os.getenv('DB_USER_V2', 'root'),
     'password': os.getenv('DB_PASSWORD_V2', '123456'),
-    'database': os.getenv('DB_NAME_V2', 'finance')
+    'database': os.getenv('DB_NAME_V2', 'finance'),
+    'allow_local_infile': True,
+    # 使用C扩展驱动，减少批量插入时的协议编解码开销
+    'use_pure': False
 }
 
-def insert_bulk_data(num_records=100000):
-    """向数据库中插入大量测试数据"""
+# 多行INSERT每条语句包含的行数上限
+MULTI_ROW_CHUNK_SIZE = 1000
+# 估算的单行参数字节数，用于按max_allowed_packet限制每条语句的行数
+ESTIMATED_ROW_BYTES = 128
+
+def get_multi_row_chunk_size(cursor):
+    """根据max_allowed_packet计算多行INSERT每条语句的行数"""
+    cursor.execute("SHOW VARIABLES LIKE 'max_allowed_packet'")
+    row = cursor.fetchone()
+    if not row:
+        return MULTI_ROW_CHUNK_SIZE
+    # 预留一半空间给SQL文本和协议开销
+    return max(1, min(MULTI_ROW_CHUNK_SIZE, int(row[1]) // 2 // ESTIMATED_ROW_BYTES))
+
+def insert_multi_row(cursor, table, columns, rows, chunk_size=MULTI_ROW_CHUNK_SIZE):
+    """用 INSERT ... VALUES (...),(...) 多行语句插入数据，每chunk_size行一条语句"""
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    column_list = ", ".join(columns)
+    
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        sql = f"INSERT INTO {table} ({column_list}) VALUES " + ", ".join([placeholders] * len(chunk))
+        cursor.execute(sql, list(itertools.chain.from_iterable(chunk)))
+
+# 用户角色分布：80% 员工，15% 主管，5% 管理员
+ROLES = ["staff"] * 80 + ["supervisor"] * 15 + ["admin"] * 5
+DEPARTMENTS = ["华东区", "华南区", "华北区", "西南区", "东北区", "西北区"]
+ROLE_CHOICES = np.array(ROLES)
+DEPARTMENT_CHOICES = np.array(DEPARTMENTS)
+
+# 每批生成的记录数
+BATCH_SIZE = 10000
+# 每个事务最多包含的行数，超过后提交一次以限制undo/redo日志大小
+COMMIT_ROWS = 1000000
+# 默认并行加载的线程/连接数
+DEFAULT_WORKERS = 4
+
+# 服务端生成数据用的序列CTE，生成 0..%s 的整数
+SEQ_CTE = "WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) "
+
+# 服务端生成用户：角色和RAND()在派生表中先算好，避免外层引用时被重复求值
+SERVER_USERS_SQL = (
+    "INSERT INTO users (id, name, role, department, parent_id) " + SEQ_CTE +
+    "SELECT /*+ NO_MERGE(t) */ id, CONCAT('用户', id), role, "
+    "ELT(1 + FLOOR(RAND() * 6), " + ", ".join(f"'{d}'" for d in DEPARTMENTS) + "), "
+    "CASE WHEN role = 'admin' OR id <= 4 THEN NULL "
+    "     WHEN RAND() < 0.7 THEN 1 + FLOOR(RAND() * 4) "
+    "     ELSE 5 + FLOOR(RAND() * (GREATEST(5, id - 1) - 4)) END "
+    "FROM (SELECT /*+ NO_MERGE(s) */ %s + n AS id, "
+    "      CASE WHEN r < 0.80 THEN 'staff' WHEN r < 0.95 THEN 'supervisor' ELSE 'admin' END AS role "
+    "      FROM (SELECT n, RAND() AS r FROM seq) s) t"
+)
+
+SERVER_ORDERS_SQL = (
+    "INSERT INTO orders (order_id, user_id) " + SEQ_CTE +
+    "SELECT %s + n, 1 + FLOOR(RAND() * %s) FROM seq"
+)
+
+SERVER_CUSTOMERS_SQL = (
+    "INSERT INTO customers (customer_id, admin_user_id) " + SEQ_CTE +
+    "SELECT %s + n, 1 + FLOOR(RAND() * %s) FROM seq"
+)
+
+SERVER_FUNDS_SQL = (
+    "INSERT INTO financial_funds (fund_id, handle_by, order_id, customer_id, amount) " + SEQ_CTE +
+    "SELECT %s + n, 1 + FLOOR(RAND() * %s), "
+    "2001 + FLOOR(RAND() * (%s - 2000)), 3001 + FLOOR(RAND() * (%s - 3000)), "
+    "ROUND(1000 + RAND() * 999000, 2) FROM seq"
+)
+
+def generate_user_rows(start_id, count):
+    """在客户端用NumPy向量化生成一批用户数据"""
+    rng = np.random.default_rng()
+    user_ids = np.arange(start_id, start_id + count)
+    roles = rng.choice(ROLE_CHOICES, size=count)
+    departments = rng.choice(DEPARTMENT_CHOICES, size=count)
+    # 下级用户的parent_id可能指向已有用户或本批次前面的用户：
+    # 70%的概率指向1-4号用户，30%的概率指向其他用户
+    parent_ids = np.where(
+        rng.random(count) < 0.7,
+        rng.integers(1, 5, size=count),
+        rng.integers(5, np.maximum(5, user_ids - 1) + 1)
+    )
+    # 管理员和1-4号用户没有上级
+    no_parent = (roles == "admin") | (user_ids <= 4)
+    
+    return [
+        (user_id, f"用户{user_id}", role, department, None if orphan else parent_id)
+        for user_id, role, department, parent_id, orphan in zip(
+            user_ids.tolist(), roles.tolist(), departments.tolist(),
+            parent_ids.tolist(), no_parent.tolist()
+        )
+    ]
+
+def generate_order_rows(start_id, count, max_user_id):
+    """在客户端用NumPy向量化生成一批订单数据"""
+    rng = np.random.default_rng()
+    return list(zip(
+        range(start_id, start_id + count),
+        rng.integers(1, max_user_id + 1, size=count).tolist()
+    ))
+
+def generate_customer_rows(start_id, count, max_user_id):
+    """在客户端用NumPy向量化生成一批客户数据"""
+    rng = np.random.default_rng()
+    return list(zip(
+        range(start_id, start_id + count),
+        rng.integers(1, max_user_id + 1, size=count).tolist()
+    ))
+
+def generate_fund_rows(start_id, count, max_user_id, max_order_id, max_customer_id):
+    """在客户端用NumPy向量化生成一批财务资金数据"""
+    rng = np.random.default_rng()
+    return list(zip(
+        range(start_id, start_id + count),
+        rng.integers(1, max_user_id + 1, size=count).tolist(),
+        rng.integers(2001, max_order_id + 1, size=count).tolist(),
+        rng.integers(3001, max_customer_id + 1, size=count).tolist(),
+        np.round(rng.uniform(1000, 1000000, size=count), 2).tolist()
+    ))
+
+# 各表的二级索引，LOAD DATA 导入前删除、导入后重建
+SECONDARY_INDEXES = {
+    'users': {'idx_users_role': '(role)', 'idx_users_parent_id': '(parent_id)'},
+    'orders': {'idx_orders_user_id': '(user_id)'},
+    'customers': {'idx_customers_admin_user_id': '(admin_user_id)'},
+    'financial_funds': {
+        'idx_funds_handle_by': '(handle_by)',
+        'idx_funds_order_id': '(order_id)',
+        'idx_funds_customer_id': '(customer_id)'
+    }
+}
+
+def drop_secondary_indexes(cursor, table):
+    """删除表上已存在的二级索引，返回被删除的索引名"""
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME != 'PRIMARY'",
+        (table,)
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    to_drop = [name for name in SECONDARY_INDEXES.get(table, {}) if name in existing]
+    
+    if to_drop:
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"DROP INDEX {name}" for name in to_drop))
+    return to_drop
+
+def add_secondary_indexes(cursor, table, index_names):
+    """重建之前删除的二级索引"""
+    if not index_names:
+        return
+    definitions = SECONDARY_INDEXES[table]
+    cursor.execute(
+        f"ALTER TABLE {table} " +
+        ", ".join(f"ADD INDEX {name} {definitions[name]}" for name in index_names)
+    )
+
+def load_rows_infile(cursor, table, columns, path, nullable=()):
+    """用 LOAD DATA LOCAL INFILE 导入CSV文件，nullable中的列空字符串转为NULL"""
+    column_list = ", ".join(f"@{col}" if col in nullable else col for col in columns)
+    set_clause = ""
+    if nullable:
+        set_clause = " SET " + ", ".join(f"{col} = NULLIF(@{col}, '')" for col in nullable)
+    
+    cursor.execute(
+        f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+        f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+        f"({column_list}){set_clause}",
+        (path,)
+    )
+
+def load_in_batches(num_records, label, load_batch, batch_size=BATCH_SIZE):
+    """按批次调用load_batch(offset, count)并显示进度"""
+    progress_step = max(1, num_records // 10)  # 10%进度显示间隔
+    
+    for i in range(0, num_records, batch_size):
+        count = min(batch_size, num_records - i)
+        load_batch(i, count)
+        
+        done = i + count
+        if done % progress_step == 0 or done == num_records:
+            print(f"已插入 {done:,}/{num_records:,} {label} ({(done / num_records * 100):.1f}%)")
+
+def prepare_bulk_session(cursor, mode):
+    """设置批量插入的会话参数，返回多行INSERT的分块大小"""
+    cursor.execute("SET foreign_key_checks = 0")
+    cursor.execute("SET unique_checks = 0")
+    cursor.execute("SET autocommit = 0")
+    # 减少批量导入期间的undo保留
+    cursor.execute("SET SESSION transaction_isolation = 'READ-COMMITTED'")
+    
+    if mode == 'insert':
+        return get_multi_row_chunk_size(cursor)
+    if mode == 'server':
+        # 每批的递归深度等于批大小
+        cursor.execute("SET SESSION cte_max_recursion_depth = %s", (BATCH_SIZE,))
+    return None
+
+def relax_durability(cursor):
+    """导入期间把redo/binlog刷盘改为按秒批量，返回原值；无权限时返回None
+    
+    innodb_flush_log_at_trx_commit 和 sync_binlog 只能在全局级别设置
+    """
+    try:
+        cursor.execute("SELECT @@GLOBAL.innodb_flush_log_at_trx_commit, @@GLOBAL.sync_binlog")
+        saved = cursor.fetchone()
+        cursor.execute("SET GLOBAL innodb_flush_log_at_trx_commit = 2")
+        cursor.execute("SET GLOBAL sync_binlog = 0")
+        return saved
+    except mysql.connector.Error as e:
+        print(f"警告: 无法调整刷盘参数: {e}")
+        return None
+
+def restore_durability(cursor, saved):
+    """恢复relax_durability修改前的刷盘参数"""
+    if saved is None:
+        return
+    try:
+        cursor.execute("SET GLOBAL innodb_flush_log_at_trx_commit = %s", (saved[0],))
+        cursor.execute("SET GLOBAL sync_binlog = %s", (saved[1],))
+    except mysql.connector.Error as e:
+        print(f"警告: 无法恢复刷盘参数: {e}")
+
+def load_table(pool, mode, table, columns, label, start_id, num_records,
+               generate, server_sql, server_args, nullable=()):
+    """在连接池的一个连接上向表插入num_records条记录，每COMMIT_ROWS行提交一次"""
+    conn = pool.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        chunk_size = prepare_bulk_session(cursor, mode)
+        
+        if mode == 'load-data':
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as f:
+                writer = csv.writer(f, lineterminator='\n')
+                load_in_batches(num_records, label,
+                                lambda offset, count: writer.writerows(generate(start_id + offset, count)))
+            try:
+                load_rows_infile(cursor, table, columns, f.name, nullable)
+            finally:
+                os.remove(f.name)
+        else:
+            if mode == 'insert':
+                def load_batch(offset, count):
+                    insert_multi_row(cursor, table, columns, generate(start_id + offset, count), chunk_size)
+            else:
+                def load_batch(offset, count):
+                    cursor.execute(server_sql, (count - 1, start_id + offset, *server_args))
+            
+            # 不逐批提交，每累计COMMIT_ROWS行提交一次
+            commit_batches = max(1, COMMIT_ROWS // BATCH_SIZE)
+            batches_done = 0
+            
+            def load_and_commit(offset, count):
+                nonlocal batches_done
+                load_batch(offset, count)
+                batches_done += 1
+                if batches_done % commit_batches == 0:
+                    conn.commit()
+            
+            load_in_batches(num_records, label, load_and_commit)
+        
+        # 最后提交剩余的数据
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def wait_all(futures):
+    """等待所有任务完成，任一任务出错时抛出异常"""
+    for future in as_completed(futures):
+        future.result()
+
+def insert_bulk_data(num_records=100000, client_gen=False, load_data=False, workers=DEFAULT_WORKERS):
+    """向数据库中插入大量测试数据
+    
+    默认在服务端用递归CTE + RAND()生成数据，避免客户端生成和网络传输；
+    client_gen=True 时退回到Python生成数据再用多行INSERT写入；
+    load_data=True 时在Python生成数据写入CSV，再用 LOAD DATA LOCAL INFILE 导入。
+    
+    用户表按ID区间分成workers个分区并行插入，之后订单、客户、财务资金三个表并行插入，
+    每个线程使用连接池中的独立连接。
+    """
     print(f"开始插入{num_records:,}条记录到每个表...")
+    # use_pure=False 只在C扩展已安装时生效，缺失时连接器静默退回纯Python实现
+    if not mysql.connector.HAVE_CEXT:
+        print("警告: mysql-connector C扩展不可用，将使用纯Python实现，批量插入会明显变慢")
     start_time = time.time()
+    mode = 'load-data' if load_data else 'insert' if client_gen else 'server'
     
     try:
         conn = mysql.connector.connect(**config)
         cursor = conn.cursor()
         
         # 设置批量插入优化参数
-        cursor.execute("SET foreign_key_checks = 0")
-        cursor.execute("SET unique_checks = 0")
-        cursor.execute("SET autocommit = 0")
-        
-        # 保留原有数据，只添加新数据
+        prepare_bulk_session(cursor, mode)
         
-        # 用户数据生成
-        print("生成用户数据...")
-        roles = ["staff"] * 80 + ["supervisor"] * 15 + ["admin"] * 5  # 分布：80% 员工，15% 主管，5% 管理员
-        departments = ["华东区", "华南区", "华北区", "西南区", "东北区", "西北区"]
+        if load_data:
+            try:
+                cursor.execute("SET GLOBAL local_infile = 1")
+            except mysql.connector.Error as e:
+                print(f"警告: 无法开启local_infile: {e}")
         
-        # 确定起始ID (找到当前最大ID)
-        cursor.execute("SELECT MAX(id) FROM users")
-        max_user_id = cursor.fetchone()[0] or 0
-        start_user_id = max_user_id + 1
+        # 导入期间放宽刷盘要求，结束后恢复
+        saved_durability = relax_durability(cursor)
         
-        # 批量插入用户
-        batch_size = 10000
-        progress_step = max(1, num_records // 10)  # 10%进度显示间隔
-        
-        for i in range(0, num_records, batch_size):
-            batch_size = min(batch_size, num_records - i)
-            user_batch = []
-            
-            for j in range(batch_size):
-                user_id = start_user_id + i + j
-                name = f"用户{user_id}"
-                role = random.choice(roles)
-                department = random.choice(departments)
-                # 下级用户的parent_id可能指向已有用户或本批次前面的用户
-                if role != "admin" and user_id > 4:
-                    if random.random() < 0.7:  # 70%的概率指向1-4号用户
-                        parent_id = random.randint(1, 4)
-                    else:  # 30%的概率指向其他用户
-                        parent_id = random.randint(5, max(5, user_id - 1))
-                else:
-                    parent_id = None
-                
-                user_batch.append((user_id, name, role, department, parent_id))
+        try:
+            # 保留原有数据，只添加新数据
             
-            cursor.executemany(
-                "INSERT INTO users (id, name, role, department, parent_id) VALUES (%s, %s, %s, %s, %s)",
-                user_batch
-            )
-            conn.commit()
-            
-            if (i + batch_size) % progress_step == 0 or (i + batch_size) == num_records:
-                print(f"已插入 {i + batch_size:,}/{num_records:,} 个用户 ({((i + batch_size) / num_records * 100):.1f}%)")
-        
-        # 更新最大用户ID
-        max_user_id = start_user_id + num_records - 1
-        
-        # 订单数据生成
-        print("\n生成订单数据...")
-        cursor.execute("SELECT MAX(order_id) FROM orders")
-        max_order_id = cursor.fetchone()[0] or 2000
-        start_order_id = max_order_id + 1
-        
-        for i in range(0, num_records, batch_size):
-            batch_size = min(batch_size, num_records - i)
-            order_batch = []
+            # 确定各表起始ID (找到当前最大ID)
+            cursor.execute("SELECT MAX(id) FROM users")
+            start_user_id = (cursor.fetchone()[0] or 0) + 1
+            cursor.execute("SELECT MAX(order_id) FROM orders")
+            start_order_id = (cursor.fetchone()[0] or 2000) + 1
+            cursor.execute("SELECT MAX(customer_id) FROM customers")
+            start_customer_id = (cursor.fetchone()[0] or 3000) + 1
+            cursor.execute("SELECT MAX(fund_id) FROM financial_funds")
+            start_fund_id = (cursor.fetchone()[0] or 1000) + 1
             
-            for j in range(batch_size):
-                order_id = start_order_id + i + j
-                user_id = random.randint(1, max_user_id)
-                
-                order_batch.append((order_id, user_id))
+            # 插入后各表的最大ID，外键列的随机范围据此确定
+            max_user_id = start_user_id + num_records - 1
+            max_order_id = start_order_id + num_records - 1
+            max_customer_id = start_customer_id + num_records - 1
             
-            cursor.executemany(
-                "INSERT INTO orders (order_id, user_id) VALUES (%s, %s)",
-                order_batch
-            )
-            conn.commit()
+            if load_data:
+                dropped_indexes = {table: drop_secondary_indexes(cursor, table) for table in SECONDARY_INDEXES}
             
-            if (i + batch_size) % progress_step == 0 or (i + batch_size) == num_records:
-                print(f"已插入 {i + batch_size:,}/{num_records:,} 个订单 ({((i + batch_size) / num_records * 100):.1f}%)")
-        
-        # 更新最大订单ID
-        max_order_id = start_order_id + num_records - 1
-        
-        # 客户数据生成
-        print("\n生成客户数据...")
-        cursor.execute("SELECT MAX(customer_id) FROM customers")
-        max_customer_id = cursor.fetchone()[0] or 3000
-        start_customer_id = max_customer_id + 1
-        
-        for i in range(0, num_records, batch_size):
-            batch_size = min(batch_size, num_records - i)
-            customer_batch = []
+            pool = pooling.MySQLConnectionPool(pool_name="bulk_load", pool_size=workers, **config)
             
-            for j in range(batch_size):
-                customer_id = start_customer_id + i + j
-                admin_user_id = random.randint(1, max_user_id)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # 用户数据生成：按不重叠的ID区间分区并行插入
+                print("生成用户数据...")
+                partition_size = -(-num_records // workers)
+                wait_all([
+                    executor.submit(
+                        load_table, pool, mode, 'users', ('id', 'name', 'role', 'department', 'parent_id'),
+                        f"个用户(分区{index + 1})", start_user_id + offset, min(partition_size, num_records - offset),
+                        generate_user_rows, SERVER_USERS_SQL, (), ('parent_id',)
+                    )
+                    for index, offset in enumerate(range(0, num_records, partition_size))
+                ])
                 
-                customer_batch.append((customer_id, admin_user_id))
-            
-            cursor.executemany(
-                "INSERT INTO customers (customer_id, admin_user_id) VALUES (%s, %s)",
-                customer_batch
-            )
-            conn.commit()
+                # 订单、客户、财务资金数据互不依赖，并行生成
+                print("\n生成订单、客户、财务资金数据...")
+                wait_all([
+                    executor.submit(
+                        load_table, pool, mode, 'orders', ('order_id', 'user_id'), "个订单",
+                        start_order_id, num_records,
+                        lambda start, count: generate_order_rows(start, count, max_user_id),
+                        SERVER_ORDERS_SQL, (max_user_id,)
+                    ),
+                    executor.submit(
+                        load_table, pool, mode, 'customers', ('customer_id', 'admin_user_id'), "个客户",
+                        start_customer_id, num_records,
+                        lambda start, count: generate_customer_rows(start, count, max_user_id),
+                        SERVER_CUSTOMERS_SQL, (max_user_id,)
+                    ),
+                    executor.submit(
+                        load_table, pool, mode, 'financial_funds', ('fund_id', 'handle_by', 'order_id', 'customer_id', 'amount'),
+                        "条财务记录", start_fund_id, num_records,
+                        lambda start, count: generate_fund_rows(start, count, max_user_id, max_order_id, max_customer_id),
+                        SERVER_FUNDS_SQL, (max_user_id, max_order_id, max_customer_id)
+                    )
+                ])
             
-            if (i + batch_size) % progress_step == 0 or (i + batch_size) == num_records:
-                print(f"已插入 {i + batch_size:,}/{num_records:,} 个客户 ({((i + batch_size) / num_records * 100):.1f}%)")
-        
-        # 更新最大客户ID
-        max_customer_id = start_customer_id + num_records - 1
-        
-        # 财务资金数据生成
-        print("\n生成财务资金数据...")
-        cursor.execute("SELECT MAX(fund_id) FROM financial_funds")
-        max_fund_id = cursor.fetchone()[0] or 1000
-        start_fund_id = max_fund_id + 1
-        
-        for i in range(0, num_records, batch_size):
-            batch_size = min(batch_size, num_records - i)
-            fund_batch = []
+            if load_data:
+                print("\n重建二级索引...")
+                for table, index_names in dropped_indexes.items():
+                    add_secondary_indexes(cursor, table, index_names)
             
-            for j in range(batch_size):
-                fund_id = start_fund_id + i + j
-                handle_by = random.randint(1, max_user_id)
-                order_id = random.randint(2001, max_order_id)
-                customer_id = random.randint(3001, max_customer_id)
-                amount = round(random.uniform(1000, 1000000), 2)
-                
-                fund_batch.append((fund_id, handle_by, order_id, customer_id, amount))
+            # 为一部分主管和管理员生成用户层级关系
+            # 这里只生成一部分，避免数据量过大
+            print("\n生成用户层级关系数据...")
             
-            cursor.executemany(
-                "INSERT INTO financial_funds (fund_id, handle_by, order_id, customer_id, amount) VALUES (%s, %s, %s, %s, %s)",
-                fund_batch
-            )
-            conn.commit()
+            # 取前100个主管和管理员，用两条集合语句代替逐个主管的INSERT
+            supervisors_sql = "SELECT id FROM users WHERE role IN ('supervisor', 'admin') ORDER BY id LIMIT 100"
             
-            if (i + batch_size) % progress_step == 0 or (i + batch_size) == num_records:
-                print(f"已插入 {i + batch_size:,}/{num_records:,} 条财务记录 ({((i + batch_size) / num_records * 100):.1f}%)")
-        
-        # 为一部分主管和管理员生成用户层级关系
-        # 这里只生成一部分，避免数据量过大
-        print("\n生成用户层级关系数据...")
-        
-        # 找出所有主管和管理员
-        cursor.execute("SELECT id FROM users WHERE role IN ('supervisor', 'admin') LIMIT 100")
-        supervisors = [row[0] for row in cursor.fetchall()]
-        
-        for supervisor_id in supervisors:
             # 每个用户是自己的下属(深度0)
             cursor.execute(
-                "INSERT IGNORE INTO user_hierarchy (user_id, subordinate_id, depth) VALUES (%s, %s, %s)",
-                (supervisor_id, supervisor_id, 0)
+                "INSERT IGNORE INTO user_hierarchy (user_id, subordinate_id, depth) "
+                f"SELECT id, id, 0 FROM ({supervisors_sql}) s"
             )
             
-            # 找出直接下属(深度1)
-            cursor.execute("SELECT id FROM users WHERE parent_id = %s LIMIT 1000", (supervisor_id,))
-            direct_subordinates = [row[0] for row in cursor.fetchall()]
+            # 直接下属(深度1)，每个主管最多1000个
+            cursor.execute(
+                "INSERT IGNORE INTO user_hierarchy (user_id, subordinate_id, depth) "
+                "SELECT parent_id, id, 1 FROM ("
+                "    SELECT u.parent_id, u.id, ROW_NUMBER() OVER (PARTITION BY u.parent_id ORDER BY u.id) AS rn "
+                f"    FROM users u JOIN ({supervisors_sql}) s ON u.parent_id = s.id"
+                ") t WHERE rn <= 1000"
+            )
             
-            for sub_id in direct_subordinates:
-                cursor.execute(
-                    "INSERT IGNORE INTO user_hierarchy (user_id, subordinate_id, depth) VALUES (%s, %s, %s)",
-                    (supervisor_id, sub_id, 1)
-                )
-        
-        conn.commit()
-        print("用户层级关系数据生成完成")
+            conn.commit()
+            print("用户层级关系数据生成完成")
+        finally:
+            restore_durability(cursor, saved_durability)
         
         # 恢复正常设置
         cursor.execute("SET foreign_key_checks = 1")
@@ -240,10 +471,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="向财务权限系统数据库中插入大量测试数据")
     parser.add_argument("--records", type=int, default=100000, help="要插入的记录数量 (默认: 100,000)")
     parser.add_argument("--analyze", action="store_true", help="在插入数据后分析表以优化性能")
+    parser.add_argument("--client-gen", action="store_true", help="在Python中生成数据再插入 (默认在服务端用SQL生成)")
+    parser.add_argument("--load-data", action="store_true", help="在Python中生成CSV并用 LOAD DATA LOCAL INFILE 导入")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"并行加载的连接数 (默认: {DEFAULT_WORKERS})")
     
     args = parser.parse_args()
     
-    insert_bulk_data(args.records)
+    insert_bulk_data(args.records, client_gen=args.client_gen, load_data=args.load_data, workers=args.workers)
     
     if args.analyze:
         analyze_tables()
\ No newline at end of file
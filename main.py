@@ -1,9 +1,54 @@
-from typing import List, Dict, Set
+from typing import List, Dict, Set, FrozenSet
 from abc import ABC, abstractmethod
 import datetime
 
-# 模拟数据库表结构
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # numba为可选依赖，未安装时使用纯Python遍历
+    np = None
+    njit = None
+
+# 用户数达到该值且安装了numba时，下属遍历使用JIT编译的CSR广度优先搜索
+NUMBA_USER_THRESHOLD = 100000
+
+if njit is not None:
+    @njit(cache=True)
+    def _bfs_subordinates(root, child_ptr, child_idx):
+        """在CSR邻接表上从root做广度优先遍历，返回访问到的所有位置"""
+        n = child_ptr.shape[0] - 1
+        visited = np.zeros(n, dtype=np.bool_)
+        queue = np.empty(n, dtype=np.int64)
+        queue[0] = root
+        visited[root] = True
+        head = 0
+        tail = 1
+        while head < tail:
+            current = queue[head]
+            head += 1
+            for k in range(child_ptr[current], child_ptr[current + 1]):
+                child = child_idx[k]
+                if not visited[child]:
+                    visited[child] = True
+                    queue[tail] = child
+                    tail += 1
+        return queue[:tail]
+
+def build_child_csr(parent_positions):
+    """把每个用户的上级位置数组(无上级为-1)转换成CSR邻接表(child_ptr, child_idx)"""
+    has_parent = parent_positions >= 0
+    child_positions = np.nonzero(has_parent)[0]
+    parent_of_child = parent_positions[has_parent]
+    order = np.argsort(parent_of_child, kind="stable")
+
+    child_ptr = np.zeros(len(parent_positions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parent_of_child, minlength=len(parent_positions)), out=child_ptr[1:])
+    return child_ptr, child_positions[order].astype(np.int64)
+
+# 模拟数据库表结构，使用__slots__去掉每个实例的__dict__
 class User:
+    __slots__ = ('id', 'name', 'role', 'department', 'parent_id')
+
     def __init__(self, id: int, name: str, role: str, department: str, parent_id: int = None):
         self.id = id
         self.name = name
@@ -12,6 +57,8 @@ class User:
         self.parent_id = parent_id
 
 class FinancialFund:
+    __slots__ = ('fund_id', 'handle_by', 'order_id', 'customer_id', 'amount')
+
     def __init__(self, fund_id: int, handle_by: int, order_id: int, customer_id: int, amount: float):
         self.fund_id = fund_id
         self.handle_by = handle_by
@@ -20,11 +67,15 @@ class FinancialFund:
         self.amount = amount
 
 class Order:
+    __slots__ = ('order_id', 'user_id')
+
     def __init__(self, order_id: int, user_id: int):
         self.order_id = order_id
         self.user_id = user_id
 
 class Customer:
+    __slots__ = ('customer_id', 'admin_user_id')
+
     def __init__(self, customer_id: int, admin_user_id: int):
         self.customer_id = customer_id
         self.admin_user_id = admin_user_id
@@ -57,43 +108,144 @@ class PermissionService:
             3003: Customer(3003, 3)
         }
 
-    def get_subordinates(self, user_id: int) -> Set[int]:
-        """递归获取所有下属ID"""
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        """重建内存索引，修改users、orders、customers或financial_funds后需要调用"""
+        # 上级ID -> 直接下属ID列表
+        self._children: Dict[int, List[int]] = {}
+        for user in self.users.values():
+            self._children.setdefault(user.parent_id, []).append(user.id)
+
+        self._build_csr()
+
+        # 用户ID -> 该用户的订单ID / 管理的客户ID
+        self._orders_by_user: Dict[int, List[int]] = {}
+        for order in self.orders.values():
+            self._orders_by_user.setdefault(order.user_id, []).append(order.order_id)
+        self._customers_by_admin: Dict[int, List[int]] = {}
+        for customer in self.customers.values():
+            self._customers_by_admin.setdefault(customer.admin_user_id, []).append(customer.customer_id)
+
+        # 处理人 / 订单ID / 客户ID -> financial_funds中的位置
+        self._funds_by_handler: Dict[int, List[int]] = {}
+        self._funds_by_order: Dict[int, List[int]] = {}
+        self._funds_by_customer: Dict[int, List[int]] = {}
+        for pos, fund in enumerate(self.financial_funds):
+            self._funds_by_handler.setdefault(fund.handle_by, []).append(pos)
+            self._funds_by_order.setdefault(fund.order_id, []).append(pos)
+            self._funds_by_customer.setdefault(fund.customer_id, []).append(pos)
+
+        # 超管的全量范围只需计算一次
+        self._all_user_ids: FrozenSet[int] = frozenset(self.users)
+        self._all_order_ids: FrozenSet[int] = frozenset(self.orders)
+        self._all_customer_ids: FrozenSet[int] = frozenset(self.customers)
+
+        self.invalidate()
+
+    def _build_csr(self):
+        """用户数较多且可用numba时，把上下级关系转成CSR数组供JIT遍历"""
+        self._csr = None
+        if njit is None or len(self.users) < NUMBA_USER_THRESHOLD:
+            return
+
+        user_ids = np.fromiter(self.users, dtype=np.int64, count=len(self.users))
+        position = {uid: pos for pos, uid in enumerate(user_ids.tolist())}
+        parents = np.fromiter((position.get(u.parent_id, -1) for u in self.users.values()),
+                              dtype=np.int64, count=len(self.users))
+
+        child_ptr, child_idx = build_child_csr(parents)
+        self._csr = (position, user_ids, child_ptr, child_idx)
+
+    def invalidate(self, user_id: int = None):
+        """清除下属和数据范围缓存，user_id为None时清除全部
+
+        只清除单个用户时，其上级的缓存不受影响；层级或归属关系变化时应清除全部
+        """
+        if user_id is None:
+            self._subordinates_cache: Dict[int, FrozenSet[int]] = {}
+            self._scope_cache: Dict[tuple, Dict] = {}
+            self._fund_positions_cache: Dict[tuple, tuple] = {}
+            return
+
+        self._subordinates_cache.pop(user_id, None)
+        for cache in (self._scope_cache, self._fund_positions_cache):
+            for key in [key for key in cache if key[0] == user_id]:
+                del cache[key]
+
+    def get_subordinates(self, user_id: int) -> FrozenSet[int]:
+        """递归获取所有下属ID，结果按用户缓存"""
+        cached = self._subordinates_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        if self._csr is not None and user_id in self._csr[0]:
+            position, user_ids, child_ptr, child_idx = self._csr
+            visited = _bfs_subordinates(position[user_id], child_ptr, child_idx)
+            cached = self._subordinates_cache[user_id] = frozenset(user_ids[visited].tolist())
+            return cached
+
         subordinates = set()
         stack = [user_id]
 
         while stack:
             current = stack.pop()
+            if current in subordinates:
+                continue
             subordinates.add(current)
-            for uid, user in self.users.items():
-                if user.parent_id == current:
-                    stack.append(uid)
-        return subordinates
+            stack.extend(self._children.get(current, ()))
+
+        cached = self._subordinates_cache[user_id] = frozenset(subordinates)
+        return cached
 
     def get_accessible_data_scope(self, user: User) -> Dict:
-        """获取数据权限范围"""
+        """获取数据权限范围，结果按(用户ID, 角色)缓存，各集合只读"""
+        key = (user.id, user.role)
+        cached = self._scope_cache.get(key)
+        if cached is not None:
+            return cached
+
         scope = {"handle_by": set(), "order_ids": set(), "customer_ids": set()}
 
         if user.role == "admin":
-            scope["handle_by"] = {u.id for u in self.users.values()}
-            scope["order_ids"] = {o.order_id for o in self.orders.values()}
-            scope["customer_ids"] = {c.customer_id for c in self.customers.values()}
+            scope["handle_by"] = self._all_user_ids
+            scope["order_ids"] = self._all_order_ids
+            scope["customer_ids"] = self._all_customer_ids
         elif user.role == "supervisor":
             subordinates = self.get_subordinates(user.id)
-            scope["handle_by"] = {u.id for u in self.users.values() if u.id in subordinates}
-            scope["order_ids"] = {o.order_id for o in self.orders.values()
-                                if self.users[o.user_id].id in subordinates}
-            scope["customer_ids"] = {c.customer_id for c in self.customers.values()
-                                if self.users[c.admin_user_id].id in subordinates}
+            scope["handle_by"] = subordinates
+            # 一次遍历下属，从倒排索引中收集订单和客户
+            for uid in subordinates:
+                scope["order_ids"].update(self._orders_by_user.get(uid, ()))
+                scope["customer_ids"].update(self._customers_by_admin.get(uid, ()))
         elif user.role == "staff":
             scope["handle_by"] = {user.id}
-            scope["order_ids"] = {o.order_id for o in self.orders.values()
-                                if o.user_id == user.id}
-            scope["customer_ids"] = {c.customer_id for c in self.customers.values()
-                                if c.admin_user_id == user.id}
+            scope["order_ids"] = set(self._orders_by_user.get(user.id, ()))
+            scope["customer_ids"] = set(self._customers_by_admin.get(user.id, ()))
 
+        scope = {name: frozenset(ids) for name, ids in scope.items()}
+        self._scope_cache[key] = scope
         return scope
 
+    def get_fund_positions(self, scope: Dict) -> Set[int]:
+        """按数据权限范围查倒排索引，返回命中的financial_funds位置（三个条件为OR）"""
+        positions = set()
+        for index, ids in ((self._funds_by_handler, scope["handle_by"]),
+                           (self._funds_by_order, scope["order_ids"]),
+                           (self._funds_by_customer, scope["customer_ids"])):
+            for key in ids:
+                positions.update(index.get(key, ()))
+        return positions
+
+    def get_accessible_fund_positions(self, user: User) -> tuple:
+        """用户可见的financial_funds位置(有序)，按(用户ID, 角色)缓存"""
+        key = (user.id, user.role)
+        cached = self._fund_positions_cache.get(key)
+        if cached is None:
+            scope = self.get_accessible_data_scope(user)
+            cached = self._fund_positions_cache[key] = tuple(sorted(self.get_fund_positions(scope)))
+        return cached
+
 # 财务服务
 class FinancialService:
     def __init__(self, permission_svc: PermissionService):
@@ -101,15 +253,8 @@ class FinancialService:
 
     def get_funds(self, user: User) -> List[FinancialFund]:
         """获取财务列表"""
-        scope = self.permission_svc.get_accessible_data_scope(user)
-
-        filtered_funds = []
-        for fund in self.permission_svc.financial_funds:
-            if (fund.handle_by in scope["handle_by"] or
-                fund.order_id in scope["order_ids"] or
-                fund.customer_id in scope["customer_ids"]):
-                filtered_funds.append(fund)
-        return filtered_funds
+        funds = self.permission_svc.financial_funds
+        return [funds[pos] for pos in self.permission_svc.get_accessible_fund_positions(user)]
 
 # 模拟API网关
 class ApiGateway:
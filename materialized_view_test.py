@@ -2,6 +2,7 @@
 import os
 import time
 import argparse
+from decimal import Decimal, InvalidOperation
 import mysql.connector
 from dotenv import load_dotenv
 from prettytable import PrettyTable
@@ -56,7 +57,7 @@ def create_materialized_view():
             amount DECIMAL(15, 2),
             last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             INDEX idx_supervisor_fund (supervisor_id, fund_id),
-            INDEX idx_supervisor_amount (supervisor_id, amount),
+            INDEX idx_supervisor_amount (supervisor_id, amount, fund_id),
             INDEX idx_supervisor_id (supervisor_id),
             INDEX idx_last_updated (last_updated)
         ) ENGINE=InnoDB
@@ -124,8 +125,6 @@ JOIN financial_funds f ON h.subordinate_id = f.handle_by
 JOIN users u ON f.handle_by = u.id
 WHERE h.depth >= 0;
 
-UPDATE mv_supervisor_financial SET last_updated = NOW();
-
 SELECT COUNT(*) FROM mv_supervisor_financial;
 EOF
 
@@ -149,8 +148,131 @@ echo "物化视图刷新完成，时间: $(date)"
         cursor.close()
         conn.close()
 
-def test_query_performance(supervisor_id, page=1, page_size=10, sort_by="fund_id", sort_order="ASC", iterations=3):
-    """测试原始查询和物化视图查询的性能差异"""
+def build_subordinate_temp_tables(cursor, supervisor_id):
+    """将主管的所有下属ID及其订单ID、客户ID物化到会话临时表"""
+    for table in ("t_sub", "t_sub_orders", "t_sub_customers"):
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {table}")
+    
+    cursor.execute("CREATE TEMPORARY TABLE t_sub (id INT PRIMARY KEY) ENGINE=MEMORY")
+    cursor.execute("CREATE TEMPORARY TABLE t_sub_orders (order_id INT PRIMARY KEY) ENGINE=MEMORY")
+    cursor.execute("CREATE TEMPORARY TABLE t_sub_customers (customer_id INT PRIMARY KEY) ENGINE=MEMORY")
+    
+    cursor.execute("""
+    INSERT INTO t_sub (id)
+    WITH RECURSIVE subordinates AS (
+        SELECT id FROM users WHERE id = %s
+        UNION ALL
+        SELECT u.id FROM users u JOIN subordinates s ON u.parent_id = s.id
+    )
+    SELECT DISTINCT id FROM subordinates
+    """, (supervisor_id,))
+    
+    cursor.execute("""
+    INSERT INTO t_sub_orders (order_id)
+    SELECT o.order_id FROM orders o JOIN t_sub s ON o.user_id = s.id
+    """)
+    
+    cursor.execute("""
+    INSERT INTO t_sub_customers (customer_id)
+    SELECT c.customer_id FROM customers c JOIN t_sub s ON c.admin_user_id = s.id
+    """)
+
+# 允许的排序字段和方向
+VALID_SORT_FIELDS = ["fund_id", "amount", "handle_by", "order_id", "customer_id"]
+VALID_SORT_ORDERS = ["ASC", "DESC"]
+# 非fund_id排序列的值类型，键集分页的last_seen_value按此转换后再绑定
+SORT_VALUE_TYPES = {"amount": Decimal, "handle_by": int, "order_id": int, "customer_id": int}
+
+def parse_sort_value(sort_by, last_seen_value):
+    """把last_seen_value转换为排序列的类型；非fund_id排序缺少该值时报错，
+    否则绑定NULL后 a > NULL 恒不成立，只会得到空页"""
+    if last_seen_value is None:
+        raise ValueError(f"按 {sort_by} 排序的键集分页需要提供 last_seen_value")
+    try:
+        return SORT_VALUE_TYPES[sort_by](last_seen_value)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"last_seen_value={last_seen_value!r} 不是有效的 {sort_by} 值")
+
+def build_keyset_condition(prefix, sort_by, sort_order):
+    """构造键集分页条件SQL片段；fund_id作为排序的唯一补充键"""
+    op = ">" if sort_order == "ASC" else "<"
+    
+    if sort_by == "fund_id":
+        return f"{prefix}fund_id {op} %s"
+    
+    # 展开成 a > x OR (a = x AND id > y)，以便优化器对排序列做范围扫描
+    return f"({prefix}{sort_by} {op} %s OR ({prefix}{sort_by} = %s AND {prefix}fund_id {op} %s))"
+
+def build_keyset_params(sort_by, last_seen_fund_id, last_seen_value):
+    """键集分页条件对应的参数"""
+    if sort_by == "fund_id":
+        return [last_seen_fund_id]
+    value = parse_sort_value(sort_by, last_seen_value)
+    return [value, value, last_seen_fund_id]
+
+def build_order_clause(prefix, sort_by, sort_order):
+    """排序子句，非fund_id排序时追加fund_id保证顺序稳定"""
+    if sort_by == "fund_id":
+        return f"{prefix}fund_id {sort_order}"
+    return f"{prefix}{sort_by} {sort_order}, {prefix}fund_id {sort_order}"
+
+def build_cte_data_query(sort_by, sort_order, keyset):
+    """基于下属临时表的分页查询，参数: [键集参数...], LIMIT[, OFFSET]"""
+    keyset_sql = f"AND {build_keyset_condition('f.', sort_by, sort_order)}" if keyset else ""
+    limit_clause = "LIMIT %s" if keyset else "LIMIT %s OFFSET %s"
+    return f"""
+        SELECT f.fund_id, f.handle_by, f.order_id, f.customer_id, f.amount,
+               u.name as handler_name, u.department
+        FROM financial_funds f
+        JOIN users u ON f.handle_by = u.id
+        WHERE (f.handle_by IN (SELECT id FROM t_sub)
+        OR f.order_id IN (SELECT order_id FROM t_sub_orders)
+        OR f.customer_id IN (SELECT customer_id FROM t_sub_customers))
+        {keyset_sql}
+        ORDER BY {build_order_clause("f.", sort_by, sort_order)}
+        {limit_clause}
+        """
+
+def build_mv_data_query(sort_by, sort_order, keyset):
+    """物化视图分页查询，同时返回总数
+    
+    COUNT(*) OVER() 在LIMIT之前计算；键集分页的WHERE只剩游标之后的行，总数改用标量子查询。
+    参数: [supervisor_id(仅键集), supervisor_id, 键集参数..., LIMIT[, OFFSET]]
+    """
+    if keyset:
+        total_sql = "(SELECT COUNT(*) FROM mv_supervisor_financial WHERE supervisor_id = %s)"
+        keyset_sql = f"AND {build_keyset_condition('', sort_by, sort_order)}"
+        limit_clause = "LIMIT %s"
+    else:
+        total_sql = "COUNT(*) OVER()"
+        keyset_sql = ""
+        limit_clause = "LIMIT %s OFFSET %s"
+    return f"""
+        SELECT fund_id, handle_by, order_id, customer_id, amount,
+               handler_name, department, {total_sql} as total_count
+        FROM mv_supervisor_financial
+        WHERE supervisor_id = %s {keyset_sql}
+        ORDER BY {build_order_clause("", sort_by, sort_order)}
+        {limit_clause}
+        """
+
+# 每种排序/分页组合的SQL只拼接一次，迭代中复用同一条语句文本
+CTE_DATA_QUERIES = {
+    (sort_by, sort_order, keyset): build_cte_data_query(sort_by, sort_order, keyset)
+    for sort_by in VALID_SORT_FIELDS for sort_order in VALID_SORT_ORDERS for keyset in (False, True)
+}
+MV_DATA_QUERIES = {
+    (sort_by, sort_order, keyset): build_mv_data_query(sort_by, sort_order, keyset)
+    for sort_by in VALID_SORT_FIELDS for sort_order in VALID_SORT_ORDERS for keyset in (False, True)
+}
+
+def test_query_performance(supervisor_id, page=1, page_size=10, sort_by="fund_id", sort_order="ASC", iterations=3,
+                           last_seen_fund_id=None, last_seen_value=None):
+    """测试原始查询和物化视图查询的性能差异
+    
+    传入last_seen_fund_id(以及非fund_id排序时上一页最后一行的排序列值last_seen_value)
+    时使用键集分页从该行之后取一页，忽略page；否则按page使用OFFSET分页。
+    """
     conn = connect_db()
     if not conn:
         return
@@ -158,20 +280,27 @@ def test_query_performance(supervisor_id, page=1, page_size=10, sort_by="fund_id
     cursor = conn.cursor(dictionary=True)
     
     # 处理排序
-    valid_sort_fields = ["fund_id", "amount", "handle_by", "order_id", "customer_id"]
-    valid_sort_orders = ["ASC", "DESC"]
-    
-    if sort_by not in valid_sort_fields:
+    if sort_by not in VALID_SORT_FIELDS:
         sort_by = "fund_id"
     
-    if sort_order not in valid_sort_orders:
+    if sort_order not in VALID_SORT_ORDERS:
         sort_order = "ASC"
     
     print(f"\n=== 测试主管(ID={supervisor_id})的查询性能 ===")
-    print(f"页码: {page}, 每页记录数: {page_size}")
+    keyset = last_seen_fund_id is not None
+    if keyset:
+        print(f"键集分页: 从 fund_id={last_seen_fund_id} 之后开始, 每页记录数: {page_size}")
+    else:
+        print(f"页码: {page}, 每页记录数: {page_size}")
     print(f"排序: {sort_by} {sort_order}")
     print(f"重复次数: {iterations}")
     
+    offset = (page - 1) * page_size
+    limit_params = [page_size] if keyset else [page_size, offset]
+    keyset_params = build_keyset_params(sort_by, last_seen_fund_id, last_seen_value) if keyset else []
+    cte_data_query = CTE_DATA_QUERIES[(sort_by, sort_order, keyset)]
+    mv_data_query = MV_DATA_QUERIES[(sort_by, sort_order, keyset)]
+    
     # 测试原始递归CTE查询
     original_times = []
     original_count = 0
@@ -181,23 +310,25 @@ def test_query_performance(supervisor_id, page=1, page_size=10, sort_by="fund_id
     for i in range(iterations):
         print(f"\n迭代 {i+1}:")
         
+        # 先把下属集合及其订单、客户ID各物化一次到临时表，
+        # 避免递归CTE在计数和分页查询的三个IN子查询中被重复计算。
+        # MySQL的临时表在同一条语句中只能引用一次，所以三个ID集合分别建表
+        start_time = time.time()
+        build_subordinate_temp_tables(cursor, supervisor_id)
+        build_time = (time.time() - start_time) * 1000  # 转换为毫秒
+        
         # 获取总记录数
         start_time = time.time()
         
         count_query = """
-        WITH RECURSIVE subordinates AS (
-            SELECT id FROM users WHERE id = %s
-            UNION ALL
-            SELECT u.id FROM users u JOIN subordinates s ON u.parent_id = s.id
-        )
         SELECT COUNT(*) as total 
         FROM financial_funds f
-        WHERE f.handle_by IN (SELECT id FROM subordinates)
-        OR f.order_id IN (SELECT o.order_id FROM orders o WHERE o.user_id IN (SELECT id FROM subordinates))
-        OR f.customer_id IN (SELECT c.customer_id FROM customers c WHERE c.admin_user_id IN (SELECT id FROM subordinates))
+        WHERE f.handle_by IN (SELECT id FROM t_sub)
+        OR f.order_id IN (SELECT order_id FROM t_sub_orders)
+        OR f.customer_id IN (SELECT customer_id FROM t_sub_customers)
         """
         
-        cursor.execute(count_query, (supervisor_id,))
+        cursor.execute(count_query)
         result = cursor.fetchone()
         original_count = result['total']
         
@@ -205,33 +336,16 @@ def test_query_performance(supervisor_id, page=1, page_size=10, sort_by="fund_id
         
         # 获取分页数据
         start_time = time.time()
-        offset = (page - 1) * page_size
         
-        data_query = f"""
-        WITH RECURSIVE subordinates AS (
-            SELECT id FROM users WHERE id = %s
-            UNION ALL
-            SELECT u.id FROM users u JOIN subordinates s ON u.parent_id = s.id
-        )
-        SELECT f.fund_id, f.handle_by, f.order_id, f.customer_id, f.amount,
-               u.name as handler_name, u.department
-        FROM financial_funds f
-        JOIN users u ON f.handle_by = u.id
-        WHERE f.handle_by IN (SELECT id FROM subordinates)
-        OR f.order_id IN (SELECT o.order_id FROM orders o WHERE o.user_id IN (SELECT id FROM subordinates))
-        OR f.customer_id IN (SELECT c.customer_id FROM customers c WHERE c.admin_user_id IN (SELECT id FROM subordinates))
-        ORDER BY f.{sort_by} {sort_order}
-        LIMIT %s OFFSET %s
-        """
-        
-        cursor.execute(data_query, (supervisor_id, page_size, offset))
+        cursor.execute(cte_data_query, (*keyset_params, *limit_params))
         data = cursor.fetchall()
         
         data_time = (time.time() - start_time) * 1000  # 转换为毫秒
         
-        total_time = count_time + data_time
+        total_time = build_time + count_time + data_time
         original_times.append(total_time)
         
+        print(f"构建下属临时表用时: {build_time:.2f}ms")
         print(f"获取总数用时: {count_time:.2f}ms")
         print(f"获取数据用时: {data_time:.2f}ms")
         print(f"总执行时间: {total_time:.2f}ms")
@@ -247,45 +361,27 @@ def test_query_performance(supervisor_id, page=1, page_size=10, sort_by="fund_id
     for i in range(iterations):
         print(f"\n迭代 {i+1}:")
         
-        # 获取总记录数
-        start_time = time.time()
-        
-        count_query = """
-        SELECT COUNT(*) as total 
-        FROM mv_supervisor_financial
-        WHERE supervisor_id = %s
-        """
-        
-        cursor.execute(count_query, (supervisor_id,))
-        result = cursor.fetchone()
-        mv_count = result['total']
-        
-        count_time = (time.time() - start_time) * 1000  # 转换为毫秒
-        
-        # 获取分页数据
+        # 分页数据和总记录数在一次查询中返回
         start_time = time.time()
-        offset = (page - 1) * page_size
         
-        data_query = f"""
-        SELECT fund_id, handle_by, order_id, customer_id, amount,
-               handler_name, department
-        FROM mv_supervisor_financial
-        WHERE supervisor_id = %s
-        ORDER BY {sort_by} {sort_order}
-        LIMIT %s OFFSET %s
-        """
-        
-        cursor.execute(data_query, (supervisor_id, page_size, offset))
+        total_params = [supervisor_id] if keyset else []
+        cursor.execute(mv_data_query, (*total_params, supervisor_id, *keyset_params, *limit_params))
         data = cursor.fetchall()
         
-        data_time = (time.time() - start_time) * 1000  # 转换为毫秒
-        
-        total_time = count_time + data_time
+        if data:
+            mv_count = data[0]['total_count']
+        else:
+            # 页码超出范围时没有行可读总数，退回单独计数
+            cursor.execute(
+                "SELECT COUNT(*) as total FROM mv_supervisor_financial WHERE supervisor_id = %s",
+                (supervisor_id,)
+            )
+            mv_count = cursor.fetchone()['total']
+        
+        total_time = (time.time() - start_time) * 1000  # 转换为毫秒
         mv_times.append(total_time)
         
-        print(f"获取总数用时: {count_time:.2f}ms")
-        print(f"获取数据用时: {data_time:.2f}ms")
-        print(f"总执行时间: {total_time:.2f}ms")
+        print(f"总执行时间(数据+总数): {total_time:.2f}ms")
         print(f"总记录数: {mv_count}")
         print(f"返回记录数: {len(data)}")
     
@@ -329,13 +425,13 @@ def manual_refresh_mv():
         count_result = cursor.fetchone()
         old_count = count_result[0] if count_result else 0
         
-        # 使用直接SQL语句而不是存储过程
-        print("清空物化视图...")
-        cursor.execute("TRUNCATE TABLE mv_supervisor_financial")
+        # 在影子表中重建数据，再原子地交换表名，刷新期间读者始终能读到完整的旧数据
+        print("构建新物化视图...")
+        cursor.execute("DROP TABLE IF EXISTS mv_supervisor_financial_new, mv_supervisor_financial_old")
+        cursor.execute("CREATE TABLE mv_supervisor_financial_new LIKE mv_supervisor_financial")
         
-        print("重新填充物化视图...")
         cursor.execute("""
-        INSERT INTO mv_supervisor_financial 
+        INSERT INTO mv_supervisor_financial_new 
             (supervisor_id, fund_id, handle_by, handler_name, department, order_id, customer_id, amount)
         SELECT 
             h.user_id AS supervisor_id,
@@ -351,9 +447,16 @@ def manual_refresh_mv():
         JOIN users u ON f.handle_by = u.id
         WHERE h.depth >= 0
         """)
+        conn.commit()
+        
+        print("交换新旧物化视图...")
+        cursor.execute("""
+        RENAME TABLE mv_supervisor_financial TO mv_supervisor_financial_old,
+                     mv_supervisor_financial_new TO mv_supervisor_financial
+        """)
+        cursor.execute("DROP TABLE mv_supervisor_financial_old")
         
-        # 更新时间戳
-        cursor.execute("UPDATE mv_supervisor_financial SET last_updated = NOW()")
+        # last_updated 列默认 CURRENT_TIMESTAMP，插入时已记录刷新时间，无需再全表UPDATE
         
         end_time = time.time()
         
@@ -411,11 +514,11 @@ def get_mv_stats():
         ORDER BY record_count DESC
         LIMIT 10
         """)
-        supervisor_stats = cursor.fetchall()
         
         print("\n主管记录数前10:")
         stats_table = PrettyTable(["主管ID", "记录数"])
-        for stat in supervisor_stats:
+        # 直接迭代游标逐行读取，不先用fetchall()物化整个结果列表
+        for stat in cursor:
             stats_table.add_row([stat['supervisor_id'], stat['record_count']])
         print(stats_table)
         
@@ -435,11 +538,10 @@ def get_mv_stats():
         AND table_name = 'mv_supervisor_financial'
         ORDER BY index_name, seq_in_index
         """)
-        indices = cursor.fetchall()
         
         print("\n索引信息:")
         index_table = PrettyTable(["索引名", "列名", "序号"])
-        for idx in indices:
+        for idx in cursor:
             index_table.add_row([idx['index_name'], idx['column_name'], idx['seq_in_index']])
         print(index_table)
         
@@ -461,9 +563,18 @@ def main():
     parser.add_argument("--sort_by", type=str, default="fund_id", help="排序字段")
     parser.add_argument("--sort_order", type=str, default="ASC", choices=["ASC", "DESC"], help="排序方向")
     parser.add_argument("--iterations", type=int, default=3, help="测试迭代次数")
+    parser.add_argument("--last_seen_fund_id", type=int, help="键集分页: 上一页最后一行的fund_id")
+    parser.add_argument("--last_seen_value", type=str, help="键集分页: 上一页最后一行的排序列值(非fund_id排序时需要)")
     
     args = parser.parse_args()
     
+    # 键集分页按非fund_id排序时必须给出上一页最后一行的排序列值
+    if args.last_seen_fund_id is not None and args.sort_by in SORT_VALUE_TYPES:
+        try:
+            parse_sort_value(args.sort_by, args.last_seen_value)
+        except ValueError as e:
+            parser.error(str(e))
+    
     if args.create:
         create_materialized_view()
     
@@ -480,7 +591,9 @@ def main():
             args.page_size,
             args.sort_by,
             args.sort_order,
-            args.iterations
+            args.iterations,
+            args.last_seen_fund_id,
+            args.last_seen_value
         )
     
     # 如果没有指定任何操作，显示帮助
@@ -17,12 +17,18 @@
 """
 
 import os
+import csv
 import time
+import functools
 import argparse
+import tempfile
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
 import threading
+from itertools import zip_longest
 from prettytable import PrettyTable
 
 # 加载环境变量
@@ -36,7 +42,103 @@ config = {
     'password': os.getenv('DB_PASSWORD_V2', '123456'),
     'database': os.getenv('DB_NAME_V2', 'finance'),
     'autocommit': False,  # 手动控制事务
-    'charset': 'utf8mb4'
+    'charset': 'utf8mb4',
+    'allow_local_infile': True  # 批次结果通过LOAD DATA LOCAL INFILE装载
+}
+
+# 物化视图按 HASH(supervisor_id) 分区的数量
+MV_PARTITIONS = 16
+
+# 物化视图的数据列（last_updated由表默认值生成）
+MV_COLUMNS = ("supervisor_id", "fund_id", "handle_by", "handler_name", "department",
+              "order_id", "customer_id", "amount")
+
+# 从服务端流式读取JOIN结果时每次fetch的行数
+STREAM_FETCH_ROWS = 10000
+
+# insert装载方式的默认值：每条多行INSERT的行数、每次提交的行数
+DEFAULT_BULK_ROWS = 1000
+DEFAULT_COMMIT_ROWS = 100000
+
+# 批次连接的会话参数：重建期间源表不变，读未提交省去长查询的一致性读快照和undo保留；
+# 锁等待超时缩短到5秒，偶发的锁冲突尽快报错而不是让其他批次排队等待
+BATCH_SESSION_SETTINGS = (
+    "SET SESSION transaction_isolation = 'READ-UNCOMMITTED'",
+    "SET SESSION innodb_lock_wait_timeout = 5",
+)
+
+# 服务端预处理语句的占位符上限，决定insert方式下每条多行INSERT最多的行数
+MAX_PREPARED_PLACEHOLDERS = 65535
+MAX_BULK_ROWS = MAX_PREPARED_PLACEHOLDERS // len(MV_COLUMNS)
+
+# insert方式下写入线程攒批的最长等待时间（秒），超时即把已收到的行写入并提交
+WRITER_MAX_DELAY_SECONDS = 0.5
+# 行队列上限（块数），写入跟不上时让读取线程等待
+ROW_QUEUE_CHUNKS = 64
+# 通知写入线程结束的哨兵
+WRITER_STOP = object()
+
+# 增量维护物化视图的触发器：基表的每一行变更只把对应的一阶增量写入物化视图，
+# financial_funds 按 fund_id 增删，user_hierarchy 按 (supervisor_id, handle_by) 增删，
+# users 改名或换部门时经 user_hierarchy 按主键前缀同步冗余列。
+# 插入使用 INSERT IGNORE：TRUNCATE 不触发删除触发器，之后重新插入的基表行会再次产出
+# 物化视图中已有的行，主键冲突不能让基表的写入失败
+MV_COLUMN_LIST = ', '.join(MV_COLUMNS)
+MV_DELTA_TRIGGERS = {
+    'trg_ff_ai': f"""
+        CREATE TRIGGER trg_ff_ai AFTER INSERT ON financial_funds FOR EACH ROW
+            INSERT IGNORE INTO mv_supervisor_financial ({MV_COLUMN_LIST})
+            SELECT h.user_id, NEW.fund_id, NEW.handle_by, u.name, u.department,
+                   NEW.order_id, NEW.customer_id, NEW.amount
+            FROM user_hierarchy h
+            JOIN users u ON u.id = NEW.handle_by
+            WHERE h.subordinate_id = NEW.handle_by
+    """,
+    'trg_ff_ad': """
+        CREATE TRIGGER trg_ff_ad AFTER DELETE ON financial_funds FOR EACH ROW
+            DELETE FROM mv_supervisor_financial WHERE fund_id = OLD.fund_id
+    """,
+    'trg_ff_au': f"""
+        CREATE TRIGGER trg_ff_au AFTER UPDATE ON financial_funds FOR EACH ROW
+        BEGIN
+            IF NEW.handle_by <=> OLD.handle_by THEN
+                UPDATE mv_supervisor_financial
+                SET fund_id = NEW.fund_id, order_id = NEW.order_id,
+                    customer_id = NEW.customer_id, amount = NEW.amount
+                WHERE fund_id = OLD.fund_id;
+            ELSE
+                DELETE FROM mv_supervisor_financial WHERE fund_id = OLD.fund_id;
+                INSERT IGNORE INTO mv_supervisor_financial ({MV_COLUMN_LIST})
+                SELECT h.user_id, NEW.fund_id, NEW.handle_by, u.name, u.department,
+                       NEW.order_id, NEW.customer_id, NEW.amount
+                FROM user_hierarchy h
+                JOIN users u ON u.id = NEW.handle_by
+                WHERE h.subordinate_id = NEW.handle_by;
+            END IF;
+        END
+    """,
+    'trg_uh_ai': f"""
+        CREATE TRIGGER trg_uh_ai AFTER INSERT ON user_hierarchy FOR EACH ROW
+            INSERT IGNORE INTO mv_supervisor_financial ({MV_COLUMN_LIST})
+            SELECT NEW.user_id, f.fund_id, f.handle_by, u.name, u.department,
+                   f.order_id, f.customer_id, f.amount
+            FROM financial_funds f
+            JOIN users u ON u.id = f.handle_by
+            WHERE f.handle_by = NEW.subordinate_id
+    """,
+    'trg_uh_ad': """
+        CREATE TRIGGER trg_uh_ad AFTER DELETE ON user_hierarchy FOR EACH ROW
+            DELETE FROM mv_supervisor_financial
+            WHERE supervisor_id = OLD.user_id AND handle_by = OLD.subordinate_id
+    """,
+    'trg_users_au': """
+        CREATE TRIGGER trg_users_au AFTER UPDATE ON users FOR EACH ROW
+            UPDATE mv_supervisor_financial m
+            JOIN user_hierarchy h ON m.supervisor_id = h.user_id AND m.handle_by = h.subordinate_id
+            SET m.handler_name = NEW.name, m.department = NEW.department
+            WHERE h.subordinate_id = NEW.id
+              AND NOT (NEW.name <=> OLD.name AND NEW.department <=> OLD.department)
+    """,
 }
 
 # 线程锁
@@ -57,6 +159,37 @@ def connect_db():
         safe_print(f"数据库连接失败: {e}")
         return None
 
+def create_batch_pool(size):
+    """创建批次处理共用的连接池，批次借用连接，不再每批重新建立TCP连接和认证"""
+    try:
+        return pooling.MySQLConnectionPool(pool_size=min(size, pooling.CNX_POOL_MAXSIZE), **config)
+    except mysql.connector.Error as e:
+        safe_print(f"连接池创建失败: {e}")
+        return None
+
+def borrow_connection(pool):
+    """从连接池借用连接，close()即归还
+
+    连接归还时会话被重置，所以每次借用后重新设置 BATCH_SESSION_SETTINGS
+    """
+    try:
+        conn = pool.get_connection()
+    except mysql.connector.Error as e:
+        safe_print(f"获取连接失败: {e}")
+        return None
+    
+    cursor = conn.cursor()
+    try:
+        for setting in BATCH_SESSION_SETTINGS:
+            cursor.execute(setting)
+        return conn
+    except mysql.connector.Error as e:
+        safe_print(f"设置会话参数失败: {e}")
+        conn.close()
+        return None
+    finally:
+        cursor.close()
+
 def optimize_mysql_settings():
     """优化MySQL设置以提高批量插入性能"""
     conn = connect_db()
@@ -84,7 +217,8 @@ def optimize_mysql_settings():
             "SET SESSION innodb_change_buffering = all",
             "SET SESSION foreign_key_checks = 0",  # 临时禁用外键检查
             "SET SESSION unique_checks = 0",       # 临时禁用唯一性检查
-            "SET SESSION sql_log_bin = 0"          # 禁用二进制日志（如果不需要复制）
+            "SET SESSION sql_log_bin = 0",         # 禁用二进制日志（如果不需要复制）
+            *BATCH_SESSION_SETTINGS                # 读未提交、锁等待5秒超时
         ]
         
         for opt in optimizations:
@@ -105,6 +239,88 @@ def optimize_mysql_settings():
         cursor.close()
         conn.close()
 
+def tune_global_settings():
+    """按数据量调整全局InnoDB参数（需要SYSTEM_VARIABLES_ADMIN或SUPER权限）
+
+    缓冲池按 InnoDB 数据+索引总量的1.6倍估算，只增不减；同时放宽日志刷盘以加快批量写入。
+    返回被放宽的持久性参数的原值，供 restore_global_settings 在初始化结束后恢复
+    """
+    conn = connect_db()
+    if not conn:
+        return {}
+    
+    cursor = conn.cursor()
+    original = {}
+    
+    try:
+        safe_print("\n=== 调整全局InnoDB参数 ===")
+        
+        cursor.execute("""
+            SELECT CEILING(SUM(data_length + index_length) * 1.6 / POWER(1024, 3))
+            FROM information_schema.tables
+            WHERE engine = 'InnoDB'
+        """)
+        recommended_gb = int(cursor.fetchone()[0] or 1)
+        
+        cursor.execute("""
+            SHOW GLOBAL VARIABLES WHERE Variable_name IN
+            ('innodb_buffer_pool_size', 'innodb_log_buffer_size', 'innodb_change_buffering',
+             'innodb_flush_log_at_trx_commit', 'sync_binlog')
+        """)
+        current = dict(cursor.fetchall())
+        
+        safe_print(f"建议InnoDB缓冲池大小: {recommended_gb}G（当前 {int(current.get('innodb_buffer_pool_size', 0)) // 1024 ** 3}G）")
+        
+        settings = []
+        if recommended_gb * 1024 ** 3 > int(current.get('innodb_buffer_pool_size', 0)):
+            settings.append(("innodb_buffer_pool_size", recommended_gb * 1024 ** 3))
+        settings += [
+            ("innodb_log_buffer_size", 256 * 1024 * 1024),
+            ("innodb_change_buffering", "'all'"),
+            ("innodb_flush_log_at_trx_commit", 2),  # 每秒刷一次redo日志，崩溃时最多丢失约1秒的事务
+            ("sync_binlog", 0)
+        ]
+        
+        for name, value in settings:
+            try:
+                cursor.execute(f"SET GLOBAL {name} = {value}")
+                safe_print(f"✅ SET GLOBAL {name} = {value}")
+                if name in ("innodb_flush_log_at_trx_commit", "sync_binlog") and name in current:
+                    original[name] = current[name]
+            except mysql.connector.Error as e:
+                safe_print(f"⚠️ SET GLOBAL {name} = {value} - {e}")
+        
+        return original
+        
+    except mysql.connector.Error as e:
+        safe_print(f"❌ 全局参数调整失败: {e}")
+        return original
+    finally:
+        cursor.close()
+        conn.close()
+
+def restore_global_settings(original):
+    """恢复 tune_global_settings 放宽的持久性参数"""
+    if not original:
+        return
+    
+    conn = connect_db()
+    if not conn:
+        return
+    
+    cursor = conn.cursor()
+    
+    try:
+        for name, value in original.items():
+            try:
+                cursor.execute(f"SET GLOBAL {name} = {int(value)}")
+                safe_print(f"✅ SET GLOBAL {name} = {value}")
+            except mysql.connector.Error as e:
+                safe_print(f"⚠️ SET GLOBAL {name} = {value} - {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
 def backup_and_recreate_mv_table():
     """备份并重建物化视图表，优化结构"""
     conn = connect_db()
@@ -125,9 +341,11 @@ def backup_and_recreate_mv_table():
         
         # 创建优化后的表结构
         safe_print("创建优化的表结构...")
-        cursor.execute("""
+        # 以 (supervisor_id, fund_id) 为主键并按 supervisor_id 分区：没有自增主键的尾部热点，
+        # 不同分区的批次写入各自的B+树页面。装载期间使用DYNAMIC行格式，省去每页的zlib压缩，
+        # 需要压缩时由 compress_materialized_view 在装载后转换
+        cursor.execute(f"""
             CREATE TABLE mv_supervisor_financial (
-                id BIGINT AUTO_INCREMENT,
                 supervisor_id INT NOT NULL,
                 fund_id INT NOT NULL,
                 handle_by INT NOT NULL,
@@ -137,11 +355,11 @@ def backup_and_recreate_mv_table():
                 customer_id INT,
                 amount DECIMAL(15, 2),
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (id)
+                PRIMARY KEY (supervisor_id, fund_id)
             ) ENGINE=InnoDB 
               DEFAULT CHARSET=utf8mb4 
-              ROW_FORMAT=COMPRESSED
-              KEY_BLOCK_SIZE=8
+              ROW_FORMAT=DYNAMIC
+              PARTITION BY HASH(supervisor_id) PARTITIONS {MV_PARTITIONS}
         """)
         
         # 注意：暂时不创建其他索引，在数据插入完成后再添加
@@ -177,17 +395,28 @@ def get_supervisor_batches(batch_size=100):
         
         supervisors = cursor.fetchall()
         
-        # 分批，每批包含batch_size个supervisor
+        # 按 supervisor_id % MV_PARTITIONS 分组，每批只写入物化视图的一个分区
+        partitions = [[] for _ in range(MV_PARTITIONS)]
+        for sup_id, count in supervisors:
+            partitions[sup_id % MV_PARTITIONS].append((sup_id, count))
+        
+        partition_batches = [
+            [partition[i:i + batch_size] for i in range(0, len(partition), batch_size)]
+            for partition in partitions
+        ]
+        
+        # 各分区的批次轮流排列，同时运行的批次落在不同分区
         batches = []
-        for i in range(0, len(supervisors), batch_size):
-            batch = supervisors[i:i + batch_size]
-            batch_subordinates = sum(count for _, count in batch)
-            batches.append({
-                'batch_id': i // batch_size + 1,
-                'supervisors': [sup_id for sup_id, _ in batch],
-                'supervisor_count': len(batch),
-                'estimated_records': batch_subordinates  # 估算记录数
-            })
+        for round_batches in zip_longest(*partition_batches):
+            for batch in round_batches:
+                if not batch:
+                    continue
+                batches.append({
+                    'batch_id': len(batches) + 1,
+                    'supervisors': [sup_id for sup_id, _ in batch],
+                    'supervisor_count': len(batch),
+                    'estimated_records': sum(count for _, count in batch)  # 估算记录数
+                })
         
         return batches
         
@@ -198,14 +427,207 @@ def get_supervisor_batches(batch_size=100):
         cursor.close()
         conn.close()
 
-def process_supervisor_batch(batch_info, total_batches):
-    """处理单个supervisor批次"""
+def create_handler_stage():
+    """物化 user_hierarchy ⋈ users 到 mv_handler_stage，供所有批次共用
+
+    各批次在各自连接上执行，临时表不可见，所以使用普通表并在填充结束后删除。
+    主键以 supervisor_id 开头，批次的 supervisor_id IN (...) 条件直接走主键范围扫描。
+    """
     conn = connect_db()
     if not conn:
-        return {'success': False, 'error': 'Database connection failed'}
+        return False
     
     cursor = conn.cursor()
     
+    try:
+        safe_print("物化 supervisor-经办人 关系...")
+        start_time = time.time()
+        
+        cursor.execute("DROP TABLE IF EXISTS mv_handler_stage")
+        cursor.execute("""
+            CREATE TABLE mv_handler_stage (
+                supervisor_id INT NOT NULL,
+                handle_by INT NOT NULL,
+                handler_name VARCHAR(255),
+                department VARCHAR(100),
+                PRIMARY KEY (supervisor_id, handle_by)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute("""
+            INSERT INTO mv_handler_stage (supervisor_id, handle_by, handler_name, department)
+            SELECT h.user_id, h.subordinate_id, u.name, u.department
+            FROM user_hierarchy h
+            JOIN users u ON u.id = h.subordinate_id
+        """)
+        staged_count = cursor.rowcount
+        conn.commit()
+        
+        safe_print(f"✅ 已物化 {staged_count:,} 条关系，耗时 {time.time() - start_time:.2f}s")
+        return True
+        
+    except mysql.connector.Error as e:
+        safe_print(f"❌ 物化 supervisor-经办人 关系失败: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def drop_handler_stage():
+    """删除 mv_handler_stage"""
+    conn = connect_db()
+    if not conn:
+        return
+    
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("DROP TABLE IF EXISTS mv_handler_stage")
+    except mysql.connector.Error as e:
+        safe_print(f"⚠️ 删除 mv_handler_stage 失败: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+def stream_batch_rows(cursor, supervisors, fetch_rows=STREAM_FETCH_ROWS):
+    """在非缓冲游标上执行本批次supervisor的JOIN查询，按fetch_rows行分块产出结果
+
+    user_hierarchy ⋈ users 已预先物化在 mv_handler_stage 中，每批只需一次两表JOIN
+    """
+    placeholders = ','.join(['%s'] * len(supervisors))
+    
+    select_query = f"""
+        SELECT 
+            t.supervisor_id,
+            f.fund_id,
+            f.handle_by,
+            t.handler_name,
+            t.department,
+            f.order_id,
+            f.customer_id,
+            f.amount
+        FROM mv_handler_stage t
+        JOIN financial_funds f ON f.handle_by = t.handle_by
+        WHERE t.supervisor_id IN ({placeholders})
+    """
+    
+    cursor.execute(select_query, supervisors)
+    while True:
+        rows = cursor.fetchmany(fetch_rows)
+        if not rows:
+            break
+        yield rows
+
+def load_chunks_infile(conn, chunks, batch_id):
+    """把行块写入临时TSV文件，再用LOAD DATA LOCAL INFILE一次装载，返回装载行数"""
+    with tempfile.NamedTemporaryFile("w", newline="", encoding="utf-8", suffix=f"_mv_batch_{batch_id}.tsv",
+                                     delete=False) as f:
+        path = f.name
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        for rows in chunks:
+            writer.writerows(rows)
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE mv_supervisor_financial CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+            f"({', '.join(MV_COLUMNS)})",
+            (path,)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        os.remove(path)
+
+@functools.lru_cache(maxsize=8)
+def insert_rows_sql(row_count):
+    """row_count行的多行INSERT语句文本"""
+    row_placeholders = "(" + ",".join(["%s"] * len(MV_COLUMNS)) + ")"
+    return (f"INSERT INTO mv_supervisor_financial ({', '.join(MV_COLUMNS)}) VALUES "
+            + ",".join([row_placeholders] * row_count))
+
+def insert_rows(cursor, rows):
+    """把rows写成一条多行INSERT ... VALUES (...),(...)"""
+    cursor.execute(insert_rows_sql(len(rows)), [value for row in rows for value in row])
+
+def writer_loop(row_queue, pool, writer_result, bulk_rows=DEFAULT_BULK_ROWS, commit_rows=DEFAULT_COMMIT_ROWS):
+    """insert方式的唯一写入线程
+
+    各批次线程只负责读取JOIN结果并把行块放入row_queue；这里把收到的行拼成每条bulk_rows行的
+    多行INSERT，每commit_rows行或每WRITER_MAX_DELAY_SECONDS秒提交一次。所有写入共用一个连接
+    和一个事务序列，避免多个线程各自提交时的group commit/fsync竞争。
+    写入使用服务端预处理游标：满bulk_rows行的INSERT语句文本不变，只在第一次解析，
+    之后每次只发送参数；只有凑不满的尾块会重新预处理。
+    结果写入writer_result：inserted_count为已提交行数，出错时error为错误信息。
+    """
+    conn = borrow_connection(pool)
+    cursor = conn.cursor(prepared=True) if conn else None
+    if not conn:
+        writer_result['error'] = 'Database connection failed'
+    
+    pending = []
+    uncommitted = 0
+    last_commit = time.time()
+    stopping = False
+    
+    while not stopping:
+        try:
+            item = row_queue.get(timeout=WRITER_MAX_DELAY_SECONDS)
+        except queue.Empty:
+            item = None
+        
+        if item is WRITER_STOP:
+            stopping = True
+        elif item:
+            pending.extend(item)
+        
+        # 出错后继续取空队列，避免读取线程在put上阻塞
+        if 'error' in writer_result:
+            pending.clear()
+            continue
+        
+        try:
+            flush_all = stopping or time.time() - last_commit >= WRITER_MAX_DELAY_SECONDS
+            while len(pending) >= bulk_rows or (flush_all and pending):
+                rows, pending = pending[:bulk_rows], pending[bulk_rows:]
+                insert_rows(cursor, rows)
+                uncommitted += len(rows)
+            
+            if uncommitted and (uncommitted >= commit_rows or flush_all):
+                conn.commit()
+                writer_result['inserted_count'] += uncommitted
+                uncommitted = 0
+                last_commit = time.time()
+        except mysql.connector.Error as e:
+            safe_print(f"❌ 写入线程失败: {e}")
+            conn.rollback()
+            writer_result['error'] = str(e)
+            pending.clear()
+    
+    if cursor:
+        cursor.close()
+    if conn:
+        conn.close()
+
+def process_supervisor_batch(batch_info, total_batches, pool, loader="infile",
+                             bulk_rows=DEFAULT_BULK_ROWS, row_queue=None):
+    """处理单个supervisor批次
+
+    JOIN结果用非缓冲游标从服务端流式读出，再按loader批量写入，避免INSERT ... SELECT
+    逐行写入的redo/undo开销：
+    - infile: 写入临时TSV文件后用LOAD DATA LOCAL INFILE一次装载
+    - insert: 每bulk_rows行一块放入row_queue，由writer_loop统一写入和提交
+
+    连接从pool借用，结束时归还
+    """
+    conn = borrow_connection(pool)
+    if not conn:
+        return {'success': False, 'error': 'Database connection failed'}
+    
+    cursor = conn.cursor(buffered=False)
+    
     try:
         batch_id = batch_info['batch_id']
         supervisors = batch_info['supervisors']
@@ -215,31 +637,14 @@ def process_supervisor_batch(batch_info, total_batches):
         
         start_time = time.time()
         
-        # 构建批量插入查询
-        placeholders = ','.join(['%s'] * len(supervisors))
-        
-        insert_query = f"""
-            INSERT INTO mv_supervisor_financial 
-                (supervisor_id, fund_id, handle_by, handler_name, department, order_id, customer_id, amount)
-            SELECT 
-                h.user_id AS supervisor_id,
-                f.fund_id,
-                f.handle_by,
-                u.name AS handler_name,
-                u.department,
-                f.order_id,
-                f.customer_id,
-                f.amount
-            FROM user_hierarchy h
-            JOIN financial_funds f ON h.subordinate_id = f.handle_by
-            JOIN users u ON f.handle_by = u.id
-            WHERE h.user_id IN ({placeholders})
-        """
-        
-        cursor.execute(insert_query, supervisors)
-        inserted_count = cursor.rowcount
-        
-        conn.commit()
+        if loader == "insert":
+            inserted_count = 0
+            for rows in stream_batch_rows(cursor, supervisors, bulk_rows):
+                row_queue.put(rows)
+                inserted_count += len(rows)
+        else:
+            chunks = stream_batch_rows(cursor, supervisors)
+            inserted_count = load_chunks_infile(conn, chunks, batch_id)
         
         elapsed_time = time.time() - start_time
         
@@ -252,7 +657,8 @@ def process_supervisor_batch(batch_info, total_batches):
             'records_per_second': inserted_count / elapsed_time if elapsed_time > 0 else 0
         }
         
-        safe_print(f"✅ 批次 {batch_id} 完成：插入 {inserted_count:,} 条记录，耗时 {elapsed_time:.2f}s，速度 {result['records_per_second']:.0f} 记录/秒")
+        action = "提交写入" if loader == "insert" else "插入"
+        safe_print(f"✅ 批次 {batch_id} 完成：{action} {inserted_count:,} 条记录，耗时 {elapsed_time:.2f}s，速度 {result['records_per_second']:.0f} 记录/秒")
         
         return result
         
@@ -264,7 +670,8 @@ def process_supervisor_batch(batch_info, total_batches):
         cursor.close()
         conn.close()
 
-def parallel_populate_materialized_view(max_workers=4, batch_size=100):
+def parallel_populate_materialized_view(max_workers=4, batch_size=100, loader="infile",
+                                        bulk_rows=DEFAULT_BULK_ROWS, commit_rows=DEFAULT_COMMIT_ROWS):
     """并行填充物化视图"""
     safe_print("\n=== 并行填充物化视图 ===")
     
@@ -278,24 +685,52 @@ def parallel_populate_materialized_view(max_workers=4, batch_size=100):
     total_supervisors = sum(b['supervisor_count'] for b in batches)
     estimated_total_records = sum(b['estimated_records'] for b in batches)
     
+    # 每个线程占用一个连接，insert方式另有一个写入线程；池满时借用会直接失败，线程数不能超过池容量
+    writer_connections = 1 if loader == "insert" else 0
+    max_workers = min(max_workers, pooling.CNX_POOL_MAXSIZE - writer_connections)
+    bulk_rows = min(bulk_rows, MAX_BULK_ROWS)
+    pool = create_batch_pool(max_workers + writer_connections)
+    if not pool:
+        return False
+    
     safe_print(f"总共 {total_batches} 个批次，{total_supervisors} 个supervisor，预估 {estimated_total_records:,} 条记录")
     safe_print(f"使用 {max_workers} 个并行线程")
     
     overall_start_time = time.time()
     results = []
     
+    # 所有批次共用的 user_hierarchy ⋈ users
+    if not create_handler_stage():
+        return False
+    
+    # insert方式：批次线程只读取，由唯一的写入线程合并写入
+    row_queue = None
+    writer = None
+    writer_result = {'inserted_count': 0}
+    if loader == "insert":
+        row_queue = queue.Queue(maxsize=ROW_QUEUE_CHUNKS)
+        writer = threading.Thread(target=writer_loop,
+                                  args=(row_queue, pool, writer_result, bulk_rows, commit_rows))
+        writer.start()
+    
     # 并行处理批次
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 提交所有任务
-        future_to_batch = {
-            executor.submit(process_supervisor_batch, batch, total_batches): batch
-            for batch in batches
-        }
-        
-        # 处理完成的任务
-        for future in as_completed(future_to_batch):
-            result = future.result()
-            results.append(result)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 提交所有任务
+            future_to_batch = {
+                executor.submit(process_supervisor_batch, batch, total_batches, pool, loader, bulk_rows, row_queue): batch
+                for batch in batches
+            }
+            
+            # 处理完成的任务
+            for future in as_completed(future_to_batch):
+                result = future.result()
+                results.append(result)
+    finally:
+        if writer:
+            row_queue.put(WRITER_STOP)
+            writer.join()
+        drop_handler_stage()
     
     overall_elapsed_time = time.time() - overall_start_time
     
@@ -303,7 +738,10 @@ def parallel_populate_materialized_view(max_workers=4, batch_size=100):
     successful_batches = [r for r in results if r['success']]
     failed_batches = [r for r in results if not r['success']]
     
-    total_inserted = sum(r.get('inserted_count', 0) for r in successful_batches)
+    if writer:
+        total_inserted = writer_result['inserted_count']
+    else:
+        total_inserted = sum(r.get('inserted_count', 0) for r in successful_batches)
     average_speed = sum(r.get('records_per_second', 0) for r in successful_batches) / len(successful_batches) if successful_batches else 0
     
     safe_print(f"\n=== 并行填充完成 ===")
@@ -319,6 +757,10 @@ def parallel_populate_materialized_view(max_workers=4, batch_size=100):
         for failed in failed_batches:
             safe_print(f"  批次 {failed.get('batch_id', 'unknown')}: {failed.get('error', 'unknown error')}")
     
+    if 'error' in writer_result:
+        safe_print(f"\n写入线程失败: {writer_result['error']}")
+        return False
+    
     return len(failed_batches) == 0
 
 def create_indexes_after_data_load():
@@ -332,22 +774,21 @@ def create_indexes_after_data_load():
     try:
         safe_print("\n=== 创建索引 ===")
         
+        # (supervisor_id) 与 (supervisor_id, fund_id) 的查找由主键直接覆盖，无需单独建索引
         indexes = [
-            "ALTER TABLE mv_supervisor_financial ADD INDEX idx_supervisor_id (supervisor_id)",
-            "ALTER TABLE mv_supervisor_financial ADD INDEX idx_supervisor_fund (supervisor_id, fund_id)",
-            "ALTER TABLE mv_supervisor_financial ADD INDEX idx_supervisor_amount (supervisor_id, amount)",
-            "ALTER TABLE mv_supervisor_financial ADD INDEX idx_fund_id (fund_id)",
-            "ALTER TABLE mv_supervisor_financial ADD INDEX idx_last_updated (last_updated)"
+            "ADD INDEX idx_supervisor_amount (supervisor_id, amount)",
+            "ADD INDEX idx_fund_id (fund_id)",
+            "ADD INDEX idx_last_updated (last_updated)"
         ]
         
-        for i, index_sql in enumerate(indexes, 1):
-            safe_print(f"创建索引 {i}/{len(indexes)}...")
-            start_time = time.time()
-            
-            cursor.execute(index_sql)
-            
-            elapsed = time.time() - start_time
-            safe_print(f"  ✅ 完成，耗时 {elapsed:.2f}s")
+        # 一条ALTER只扫描一次表就建好全部索引，在线构建不阻塞读写
+        safe_print(f"创建 {len(indexes)} 个索引...")
+        start_time = time.time()
+        
+        cursor.execute(f"ALTER TABLE mv_supervisor_financial {', '.join(indexes)}, ALGORITHM=INPLACE, LOCK=NONE")
+        
+        elapsed = time.time() - start_time
+        safe_print(f"  ✅ 完成，耗时 {elapsed:.2f}s")
         
         conn.commit()
         safe_print("✅ 所有索引创建完成")
@@ -361,8 +802,8 @@ def create_indexes_after_data_load():
         cursor.close()
         conn.close()
 
-def restore_mysql_settings():
-    """恢复MySQL设置"""
+def compress_materialized_view():
+    """装载和建索引完成后把物化视图转换为压缩行格式"""
     conn = connect_db()
     if not conn:
         return False
@@ -370,34 +811,97 @@ def restore_mysql_settings():
     cursor = conn.cursor()
     
     try:
-        safe_print("\n=== 恢复MySQL设置 ===")
+        safe_print("\n=== 压缩物化视图 ===")
+        start_time = time.time()
         
-        restorations = [
-            "SET SESSION foreign_key_checks = 1",
-            "SET SESSION unique_checks = 1",
-            "SET SESSION sql_log_bin = 1"
-        ]
+        cursor.execute("ALTER TABLE mv_supervisor_financial ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8, ALGORITHM=INPLACE")
         
-        for restore in restorations:
-            try:
-                cursor.execute(restore)
-                safe_print(f"✅ {restore}")
-            except mysql.connector.Error as e:
-                safe_print(f"⚠️ {restore} - {e}")
+        safe_print(f"✅ 压缩完成，耗时 {time.time() - start_time:.2f}s")
+        return True
         
+    except mysql.connector.Error as e:
+        safe_print(f"❌ 压缩失败: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def drop_delta_triggers():
+    """删除增量维护触发器；全量重建期间不能让触发器向正在装载的表写入"""
+    conn = connect_db()
+    if not conn:
+        return False
+    
+    cursor = conn.cursor()
+    
+    try:
+        for name in MV_DELTA_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        return True
+        
+    except mysql.connector.Error as e:
+        safe_print(f"❌ 删除增量维护触发器失败: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def incremental_refresh():
+    """增量刷新：安装增量维护触发器，再补齐水位之后新增的资金记录
+
+    financial_funds 没有时间戳列，以物化视图中最大的 fund_id 作为水位。
+    先装触发器再补数，补数期间新写入的记录由触发器处理，与补数重叠的行由 INSERT IGNORE 跳过。
+    水位之前的修改和删除无法从基表中识别，需要一次全量重建。
+    
+    触发器安装后一直保留。TRUNCATE 和 DROP TABLE 不触发删除触发器，DROP TABLE users 还会
+    连带删除 trg_users_au，所以批量重建 users / user_hierarchy / financial_funds 的脚本
+    （如 rebuild_with_10k_users.py、fix_user_hierarchy.py）运行前必须先用 drop_delta_triggers()
+    删除触发器，重建后再全量初始化并重新执行 --incremental。
+    """
+    conn = connect_db()
+    if not conn:
+        return False
+    
+    cursor = conn.cursor()
+    
+    try:
+        safe_print("\n=== 增量刷新物化视图 ===")
+        start_time = time.time()
+        
+        cursor.execute("SELECT COALESCE(MAX(fund_id), 0) FROM mv_supervisor_financial")
+        watermark = cursor.fetchone()[0]
+        safe_print(f"水位 fund_id: {watermark}")
+        
+        for name, ddl in MV_DELTA_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(ddl)
+        safe_print(f"✅ 已安装 {len(MV_DELTA_TRIGGERS)} 个增量维护触发器")
+        
+        cursor.execute(f"""
+            INSERT IGNORE INTO mv_supervisor_financial ({MV_COLUMN_LIST})
+            SELECT h.user_id, f.fund_id, f.handle_by, u.name, u.department,
+                   f.order_id, f.customer_id, f.amount
+            FROM financial_funds f
+            JOIN user_hierarchy h ON h.subordinate_id = f.handle_by
+            JOIN users u ON u.id = f.handle_by
+            WHERE f.fund_id > %s
+        """, (watermark,))
+        caught_up = cursor.rowcount
         conn.commit()
-        safe_print("MySQL设置恢复完成")
+        
+        safe_print(f"✅ 补齐 {caught_up:,} 条记录，耗时 {time.time() - start_time:.2f}s")
         return True
         
     except mysql.connector.Error as e:
-        safe_print(f"❌ MySQL设置恢复失败: {e}")
+        safe_print(f"❌ 增量刷新失败: {e}")
+        conn.rollback()
         return False
     finally:
         cursor.close()
         conn.close()
 
-def update_timestamps():
-    """更新时间戳"""
+def restore_mysql_settings():
+    """恢复MySQL设置"""
     conn = connect_db()
     if not conn:
         return False
@@ -405,14 +909,27 @@ def update_timestamps():
     cursor = conn.cursor()
     
     try:
-        safe_print("\n更新时间戳...")
-        cursor.execute("UPDATE mv_supervisor_financial SET last_updated = NOW()")
+        safe_print("\n=== 恢复MySQL设置 ===")
+        
+        restorations = [
+            "SET SESSION foreign_key_checks = 1",
+            "SET SESSION unique_checks = 1",
+            "SET SESSION sql_log_bin = 1"
+        ]
+        
+        for restore in restorations:
+            try:
+                cursor.execute(restore)
+                safe_print(f"✅ {restore}")
+            except mysql.connector.Error as e:
+                safe_print(f"⚠️ {restore} - {e}")
+        
         conn.commit()
-        safe_print(f"✅ 已更新 {cursor.rowcount:,} 条记录的时间戳")
+        safe_print("MySQL设置恢复完成")
         return True
         
     except mysql.connector.Error as e:
-        safe_print(f"❌ 时间戳更新失败: {e}")
+        safe_print(f"❌ MySQL设置恢复失败: {e}")
         return False
     finally:
         cursor.close()
@@ -496,9 +1013,22 @@ def main():
     parser = argparse.ArgumentParser(description="物化视图初始化性能优化")
     parser.add_argument("--batch_size", type=int, default=100, help="每批处理的supervisor数量")
     parser.add_argument("--max_workers", type=int, default=4, help="并行线程数")
+    parser.add_argument("--loader", choices=["infile", "insert"], default="infile",
+                        help="批次写入方式：infile=LOAD DATA LOCAL INFILE，insert=多行INSERT")
+    parser.add_argument("--bulk_rows", type=int, default=DEFAULT_BULK_ROWS,
+                        help=f"insert方式下每条多行INSERT的行数（建议2000-5000，需小于max_allowed_packet，最多{MAX_BULK_ROWS}）")
+    parser.add_argument("--commit_rows", type=int, default=DEFAULT_COMMIT_ROWS, help="insert方式下每次提交的行数")
+    parser.add_argument("--tune_globals", action="store_true",
+                        help="初始化前调整全局InnoDB参数（缓冲池、日志缓冲、刷盘策略），需要管理员权限")
+    parser.add_argument("--compress_after_load", action="store_true",
+                        help="装载和建索引完成后转换为ROW_FORMAT=COMPRESSED（装载期间始终使用DYNAMIC）")
     parser.add_argument("--skip_backup", action="store_true", help="跳过表备份和重建")
     parser.add_argument("--only_indexes", action="store_true", help="只创建索引")
     parser.add_argument("--verify_only", action="store_true", help="只进行验证")
+    parser.add_argument("--incremental", action="store_true",
+                        help="不重建，安装增量维护触发器并补齐水位之后的新记录；"
+                             "批量重建基表（TRUNCATE/DROP TABLE）前必须先删除这些触发器，"
+                             "全量初始化会自动删除")
     
     args = parser.parse_args()
     
@@ -507,6 +1037,7 @@ def main():
     safe_print("🚀 物化视图初始化性能优化")
     safe_print(f"批次大小: {args.batch_size} supervisor/批次")
     safe_print(f"并行线程: {args.max_workers}")
+    safe_print(f"写入方式: {args.loader}")
     
     if args.verify_only:
         verify_materialized_view()
@@ -516,9 +1047,20 @@ def main():
         create_indexes_after_data_load()
         return
     
+    if args.incremental:
+        if incremental_refresh():
+            verify_materialized_view()
+        return
+    
     success = True
     
+    # 全量重建会重新计算所有行，先停掉增量维护触发器，重建后可用 --incremental 重新安装
+    if not drop_delta_triggers():
+        safe_print("增量维护触发器删除失败，退出")
+        return
+    
     # 1. 优化MySQL设置
+    relaxed_globals = tune_global_settings() if args.tune_globals else {}
     if not optimize_mysql_settings():
         safe_print("MySQL优化失败，但继续执行")
     
@@ -526,10 +1068,12 @@ def main():
     if not args.skip_backup:
         if not backup_and_recreate_mv_table():
             safe_print("表结构重建失败，退出")
+            restore_global_settings(relaxed_globals)
             return
     
     # 3. 并行填充数据
-    if not parallel_populate_materialized_view(args.max_workers, args.batch_size):
+    if not parallel_populate_materialized_view(args.max_workers, args.batch_size, args.loader,
+                                               args.bulk_rows, args.commit_rows):
         safe_print("数据填充失败")
         success = False
     
@@ -539,15 +1083,15 @@ def main():
             safe_print("索引创建失败")
             success = False
     
-    # 5. 更新时间戳
-    if success:
-        if not update_timestamps():
-            safe_print("时间戳更新失败")
+    # 4.1 按需压缩
+    if success and args.compress_after_load:
+        compress_materialized_view()
     
-    # 6. 恢复MySQL设置
+    # 5. 恢复MySQL设置（last_updated 由列默认值 CURRENT_TIMESTAMP 在插入时写入）
     restore_mysql_settings()
+    restore_global_settings(relaxed_globals)
     
-    # 7. 验证结果
+    # 6. 验证结果
     if success:
         verify_materialized_view()
     
@@ -1,7 +1,10 @@
 import mysql.connector
 import time
 import os
-from typing import List, Dict, Any, Tuple
+import json
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 # Database connection details from environment variables
 DB_HOST = os.environ.get("DB_HOST", "127.0.0.1")
@@ -10,6 +13,28 @@ DB_USER = os.environ.get("DB_USER", "root")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "123456")
 DB_NAME = os.environ.get("DB_NAME", "finance")
 
+# 权限范围（下属、订单、客户ID）按 supervisor_id 缓存的秒数；翻页时不必每页重查
+SCOPE_CACHE_TTL_SECONDS = 60
+# 权限范围缓存最多保留的 supervisor 数，超出时淘汰最久未使用的
+SCOPE_CACHE_MAX_ENTRIES = 4096
+
+# 权限列的ID数超过该值时不再拼 IN 列表，改为在服务端由 user_hierarchy 连接出范围，
+# 避免超长 IN 列表，也不必每页把ID装入临时表
+SCOPE_INLINE_MAX_IDS = 200
+
+# supervisor 可访问的用户（闭包表中的下属加上本人），作为派生表驱动服务端半连接
+SCOPE_USERS_SQL = "SELECT subordinate_id AS id FROM user_hierarchy WHERE user_id = %s UNION SELECT %s"
+# 各权限列从范围用户 s 连接到 financial_funds f 的方式
+SCOPE_USER_JOINS = {
+    "handle_by": "JOIN financial_funds f ON f.handle_by = s.id",
+    "order_id": "JOIN orders o ON o.user_id = s.id JOIN financial_funds f ON f.order_id = o.order_id",
+    "customer_id": ("JOIN customers c ON c.admin_user_id = s.id "
+                    "JOIN financial_funds f ON f.customer_id = c.customer_id"),
+}
+
+# supervisor_id -> (过期时间, (subordinate_ids, order_ids, customer_ids))，按最近使用排序
+_scope_cache: "OrderedDict[int, Tuple[float, Tuple[array, array, array]]]" = OrderedDict()
+
 def get_db_connection():
     """Establishes a connection to the MySQL database."""
     return mysql.connector.connect(
@@ -21,271 +46,270 @@ def get_db_connection():
         autocommit=True
     )
 
-def get_subordinate_ids(cursor, supervisor_id: int) -> List[int]:
+def _fetch_id_array(cursor) -> array:
+    """逐行读取单列整数结果到 array('i')：连接默认不缓冲结果，行从服务端流式读出，
+    每个ID只占4字节，不为每个值保留一个Python int对象"""
+    ids = array('i')
+    for (value,) in cursor:
+        ids.append(value)
+    return ids
+
+def get_subordinate_ids(cursor, supervisor_id: int) -> array:
     """1. Get a list of employee IDs managed by the supervisor."""
     query = """
         SELECT subordinate_id FROM user_hierarchy WHERE user_id = %s
     """
     cursor.execute(query, (supervisor_id,))
-    return [item[0] for item in cursor.fetchall()]
+    return _fetch_id_array(cursor)
 
-def get_order_ids_for_users(cursor, user_ids: List[int]) -> List[int]:
+def get_order_ids_for_users(cursor, user_ids: Sequence[int]) -> array:
     """2. Get a list of authorized order_ids from the orders table."""
     if not user_ids:
-        return []
-    placeholders = ','.join(['%s'] * len(user_ids))
-    query = f"SELECT order_id FROM orders WHERE user_id IN ({placeholders})"
-    cursor.execute(query, tuple(user_ids))
-    return [item[0] for item in cursor.fetchall()]
+        return array('i')
+    # 整数ID直接拼入SQL文本（无注入风险），省去逐个参数的转换和转义
+    query = f"SELECT order_id FROM orders WHERE user_id IN ({','.join(map(str, user_ids))})"
+    cursor.execute(query)
+    return _fetch_id_array(cursor)
 
-def get_customer_ids_for_users(cursor, user_ids: List[int]) -> List[int]:
+def get_customer_ids_for_users(cursor, user_ids: Sequence[int]) -> array:
     """3. Get a list of authorized customer_ids from the customers table."""
     if not user_ids:
-        return []
-    placeholders = ','.join(['%s'] * len(user_ids))
-    query = f"SELECT customer_id FROM customers WHERE admin_user_id IN ({placeholders})"
-    cursor.execute(query, tuple(user_ids))
-    return [item[0] for item in cursor.fetchall()]
-
-def estimate_total_count(cursor, handle_by_ids: List[int], order_ids: List[int], customer_ids: List[int]) -> int:
-    """估算总记录数 - 使用采样方法"""
-
-    # 使用更小的样本来估算
-    sample_size = min(100, len(handle_by_ids), len(order_ids), len(customer_ids))
+        return array('i')
+    query = f"SELECT customer_id FROM customers WHERE admin_user_id IN ({','.join(map(str, user_ids))})"
+    cursor.execute(query)
+    return _fetch_id_array(cursor)
 
-    if sample_size == 0:
-        return 0
+def get_permission_scope(cursor, supervisor_id: int) -> Tuple[array, array, array]:
+    """
+    步骤 1-3：supervisor 可访问的用户、订单、客户ID（用户包含 supervisor 本人），
+    按 supervisor_id 缓存 SCOPE_CACHE_TTL_SECONDS 秒。返回的列表为缓存共享，调用方不得修改
+    """
+    cached = _scope_cache.get(supervisor_id)
+    if cached is not None and cached[0] > time.time():
+        _scope_cache.move_to_end(supervisor_id)
+        return cached[1]
+
+    subordinate_ids = get_subordinate_ids(cursor, supervisor_id)
+    if supervisor_id not in subordinate_ids:
+        subordinate_ids.append(supervisor_id)
+
+    order_ids = get_order_ids_for_users(cursor, subordinate_ids)
+    customer_ids = get_customer_ids_for_users(cursor, subordinate_ids)
+
+    scope = (subordinate_ids, order_ids, customer_ids)
+    now = time.time()
+    # 写入时清掉已过期的条目，再按最近使用淘汰到 SCOPE_CACHE_MAX_ENTRIES 以内
+    for key in [key for key, (expires_at, _) in _scope_cache.items() if expires_at <= now]:
+        del _scope_cache[key]
+    _scope_cache[supervisor_id] = (now + SCOPE_CACHE_TTL_SECONDS, scope)
+    _scope_cache.move_to_end(supervisor_id)
+    while len(_scope_cache) > SCOPE_CACHE_MAX_ENTRIES:
+        _scope_cache.popitem(last=False)
+    return scope
+
+def invalidate_scope_cache(supervisor_id: Optional[int] = None):
+    """
+    清除权限范围缓存；supervisor_id 为 None 时全部清除。
+    层级、订单或客户归属变化会影响所有上级的范围，无法确定受影响的 supervisor 时应全部清除
+    """
+    if supervisor_id is None:
+        _scope_cache.clear()
+    else:
+        _scope_cache.pop(supervisor_id, None)
 
-    # 采样查询
-    sample_handle_by = handle_by_ids[:sample_size] if handle_by_ids else []
-    sample_order_ids = order_ids[:sample_size] if order_ids else []
-    sample_customer_ids = customer_ids[:sample_size] if customer_ids else []
+def build_scope_union(handle_by_ids: Sequence[int], order_ids: Sequence[int], customer_ids: Sequence[int],
+                      cursor_fund_id: Optional[int] = None, descending: bool = False,
+                      limit: Optional[int] = None,
+                      supervisor_id: Optional[int] = None) -> Tuple[List[Tuple[str, int]], str, List[Any]]:
+    """
+    构造权限范围内 fund_id 的 UNION 查询：每个权限列单独一支，各自走该列的索引，
+    代替 OR … IN (…) OR … IN (…)（优化器对其只能全表扫描或低效的 index_merge）
 
-    conditions = []
+    给出 supervisor_id 时，ID数超过 SCOPE_INLINE_MAX_IDS 的列从 user_hierarchy 连接出范围，
+    其余列用 IN 列表。
+    给出 cursor_fund_id/limit 时每支只取游标之后的前 limit 个 fund_id，
+    合并结果的前 limit 个必然包含在其中。返回 (各支的列与ID数, SQL, 参数)
+    """
+    scope_columns = []
+    legs = []
     params = []
 
-    if sample_handle_by:
-        placeholders = ','.join(['%s'] * len(sample_handle_by))
-        conditions.append(f"handle_by IN ({placeholders})")
-        params.extend(sample_handle_by)
-
-    if sample_order_ids:
-        placeholders = ','.join(['%s'] * len(sample_order_ids))
-        conditions.append(f"order_id IN ({placeholders})")
-        params.extend(sample_order_ids)
-
-    if sample_customer_ids:
-        placeholders = ','.join(['%s'] * len(sample_customer_ids))
-        conditions.append(f"customer_id IN ({placeholders})")
-        params.extend(sample_customer_ids)
-
-    if not conditions:
+    for column, ids in (("handle_by", handle_by_ids), ("order_id", order_ids), ("customer_id", customer_ids)):
+        if not ids:
+            continue
+        if supervisor_id is not None and len(ids) > SCOPE_INLINE_MAX_IDS:
+            leg = f"SELECT f.fund_id FROM ({SCOPE_USERS_SQL}) s {SCOPE_USER_JOINS[column]}"
+            conditions = []
+            params.extend((supervisor_id, supervisor_id))
+        else:
+            leg = "SELECT f.fund_id FROM financial_funds f"
+            conditions = [f"f.{column} IN ({','.join(['%s'] * len(ids))})"]
+            params.extend(ids)
+        if cursor_fund_id is not None:
+            conditions.append(f"f.fund_id {'<' if descending else '>'} %s")
+            params.append(cursor_fund_id)
+        if conditions:
+            leg += " WHERE " + " AND ".join(conditions)
+        if limit is not None:
+            leg += f" ORDER BY f.fund_id {'DESC' if descending else 'ASC'} LIMIT %s"
+            params.append(limit)
+        legs.append(f"({leg})")
+        scope_columns.append((column, len(ids)))
+
+    return scope_columns, " UNION ".join(legs), params
+
+def _explain_row_estimate(node) -> int:
+    """汇总 EXPLAIN FORMAT=JSON 计划中各查询块的优化器输出行数估计"""
+    if isinstance(node, list):
+        return sum(_explain_row_estimate(item) for item in node)
+    if not isinstance(node, dict):
+        return 0
+    if "nested_loop" in node:
+        # 连接的输出行数以最后一张表的估计为准
+        return _explain_row_estimate(node["nested_loop"][-1])
+    table = node.get("table")
+    if isinstance(table, dict) and ("rows_produced_per_join" in table or "rows_examined_per_scan" in table):
+        return int(table.get("rows_produced_per_join", table.get("rows_examined_per_scan", 0)))
+    return sum(_explain_row_estimate(value) for value in node.values())
+
+def estimate_total_count(cursor, handle_by_ids: Sequence[int], order_ids: Sequence[int], customer_ids: Sequence[int],
+                         supervisor_id: Optional[int] = None) -> int:
+    """估算总记录数 - 读取优化器的 EXPLAIN 行数估计，不扫描数据"""
+
+    scope_columns, union_query, params = build_scope_union(handle_by_ids, order_ids, customer_ids,
+                                                           supervisor_id=supervisor_id)
+
+    if not scope_columns:
         return 0
 
-    where_clause = ' OR '.join(conditions)
-
-    # 使用 EXPLAIN 而不是实际 COUNT 来估算
-    query = f"""
-        SELECT COUNT(*)
-        FROM financial_funds
-        WHERE {where_clause}
-        LIMIT 10000
+    # 使用 EXPLAIN 而不是实际 COUNT 来估算；各支估计相加，同一条记录命中多支时会略微偏高
+    cursor.execute(f"EXPLAIN FORMAT=JSON {union_query}", tuple(params))
+    row = cursor.fetchone()
+    estimated_total = _explain_row_estimate(json.loads(row[0])) if row else 0
+    if estimated_total > 0:
+        return estimated_total
+
+    # EXPLAIN 没有给出估计时，按索引统计估算：每个ID对应 TABLE_ROWS / CARDINALITY 行
+    cursor.execute("""
+        SELECT s.column_name, t.table_rows, s.cardinality
+        FROM information_schema.statistics s
+        JOIN information_schema.tables t
+          ON t.table_schema = s.table_schema AND t.table_name = s.table_name
+        WHERE s.table_schema = DATABASE() AND s.table_name = 'financial_funds' AND s.seq_in_index = 1
+    """)
+    table_rows = 0
+    rows_per_key = {}
+    for column, rows, cardinality in cursor.fetchall():
+        table_rows = rows or 0
+        if cardinality:
+            rows_per_key[column] = table_rows / cardinality
+
+    estimated_total = sum(count * rows_per_key.get(column, 1) for column, count in scope_columns)
+    return int(min(estimated_total, table_rows)) if table_rows else int(estimated_total)
+
+def get_financial_funds_optimized_pagination(cursor, handle_by_ids: Sequence[int], order_ids: Sequence[int],
+                                           customer_ids: Sequence[int], cursor_fund_id: Optional[int] = None,
+                                           page_size: int = 20, sort_order: str = "ASC",
+                                           estimate_total: bool = True,
+                                           supervisor_id: Optional[int] = None,
+                                           row_cursor=None) -> Tuple[List[Any], int]:
     """
+    键集（seek）分页实现：按 fund_id 排序，从上一页最后一条记录的 fund_id 之后继续读取，
+    不使用 OFFSET，任意深度的翻页代价都相同
 
-    cursor.execute(query, tuple(params))
-    sample_count = cursor.fetchone()[0]
-
-    # 基于采样比例估算总数
-    total_ids = len(handle_by_ids) + len(order_ids) + len(customer_ids)
-    sample_ids = len(sample_handle_by) + len(sample_order_ids) + len(sample_customer_ids)
-
-    if sample_ids > 0:
-        estimated_total = int(sample_count * (total_ids / sample_ids))
-    else:
-        estimated_total = 0
-
-    return estimated_total
-
-def get_financial_funds_optimized_pagination(cursor, handle_by_ids: List[int], order_ids: List[int],
-                                           customer_ids: List[int], page: int = 1, page_size: int = 20,
-                                           sort_by: str = "fund_id", sort_order: str = "ASC",
-                                           estimate_total: bool = True) -> Tuple[List[Any], int]:
+    本页记录通过 row_cursor 读取（默认即 cursor）；传入 dictionary=True 的游标时，
+    每行就是以响应字段名为键的字典
     """
-    优化的游标分页实现
-    """
-
-    # 智能批次大小 - 根据页面位置调整
-    if page <= 10:
-        batch_size = 500  # 前几页使用较小批次，确保快速响应
-    else:
-        batch_size = 1000  # 后面页使用较大批次，提高效率
-
-    offset = (page - 1) * page_size
 
     # 只在第一页时估算总数
     total_count = 0
-    if page == 1 and estimate_total:
+    if estimate_total:
         print("正在估算总记录数...")
         start_time = time.time()
-        total_count = estimate_total_count(cursor, handle_by_ids, order_ids, customer_ids)
+        total_count = estimate_total_count(cursor, handle_by_ids, order_ids, customer_ids, supervisor_id)
         print(f"总数估算耗时: {time.time() - start_time:.4f}s, 估算结果: {total_count}")
 
-    # 计算需要跳过多少个批次
-    max_ids = max(len(handle_by_ids), len(order_ids), len(customer_ids))
-    total_batches = (max_ids + batch_size - 1) // batch_size if max_ids > 0 else 0
-
-    print(f"优化分页: 第{page}页, 每页{page_size}条, 使用{batch_size}批次大小")
-
-    all_results = []
-    current_offset = 0
-
-    for batch_idx in range(total_batches):
-        start_idx = batch_idx * batch_size
-        end_idx = start_idx + batch_size
-
-        # 获取当前批次的ID
-        batch_handle_by = handle_by_ids[start_idx:end_idx] if start_idx < len(handle_by_ids) else []
-        batch_order_ids = order_ids[start_idx:end_idx] if start_idx < len(order_ids) else []
-        batch_customer_ids = customer_ids[start_idx:end_idx] if start_idx < len(customer_ids) else []
-
-        conditions = []
-        params = []
-
-        if batch_handle_by:
-            placeholders = ','.join(['%s'] * len(batch_handle_by))
-            conditions.append(f"f.handle_by IN ({placeholders})")
-            params.extend(batch_handle_by)
-
-        if batch_order_ids:
-            placeholders = ','.join(['%s'] * len(batch_order_ids))
-            conditions.append(f"f.order_id IN ({placeholders})")
-            params.extend(batch_order_ids)
-
-        if batch_customer_ids:
-            placeholders = ','.join(['%s'] * len(batch_customer_ids))
-            conditions.append(f"f.customer_id IN ({placeholders})")
-            params.extend(batch_customer_ids)
-
-        if not conditions:
-            continue
-
-        where_clause = ' OR '.join(conditions)
-
-        # 先查询当前批次的总数来确定是否需要跳过
-        if current_offset < offset:
-            count_query = f"""
-                SELECT COUNT(*)
-                FROM financial_funds f
-                WHERE {where_clause}
-            """
-            cursor.execute(count_query, tuple(params))
-            batch_count = cursor.fetchone()[0]
-
-            if current_offset + batch_count <= offset:
-                # 整个批次都需要跳过
-                current_offset += batch_count
-                print(f"跳过批次 {batch_idx + 1}: {batch_count} 条记录")
-                continue
-            else:
-                # 部分跳过
-                skip_in_batch = offset - current_offset
-                current_offset = offset
-        else:
-            skip_in_batch = 0
+    descending = sort_order.upper() == "DESC"
+    scope_columns, union_query, params = build_scope_union(
+        handle_by_ids, order_ids, customer_ids,
+        cursor_fund_id=cursor_fund_id, descending=descending, limit=page_size, supervisor_id=supervisor_id
+    )
 
-        # 计算本批次需要取多少条记录
-        remaining_needed = page_size - len(all_results)
+    if not scope_columns:
+        return [], total_count
 
-        if remaining_needed <= 0:
-            break
+    print(f"键集分页: 游标 fund_id={cursor_fund_id}, 每页{page_size}条")
 
-        # 优化的查询 - 只查询必要的字段
-        query = f"""
-            SELECT f.fund_id, f.handle_by, f.order_id, f.customer_id, f.amount,
-                   u.name as handler_name, u.department
-            FROM financial_funds f
-            FORCE INDEX (PRIMARY)
-            JOIN users u ON f.handle_by = u.id
-            WHERE {where_clause}
-            ORDER BY f.{sort_by} {sort_order}
-            LIMIT %s OFFSET %s
-        """
-
-        batch_params = list(params) + [remaining_needed, skip_in_batch]
-        cursor.execute(query, tuple(batch_params))
-        batch_results = cursor.fetchall()
-        all_results.extend(batch_results)
-
-        print(f"批次 {batch_idx + 1}: 跳过 {skip_in_batch}, 获取 {len(batch_results)} 条记录")
-
-        # 如果已经获取足够的记录，退出
-        if len(all_results) >= page_size:
-            all_results = all_results[:page_size]
-            break
+    # 先由 UNION 得到本页候选 fund_id（每支走自己的索引并已去重），再回表取明细。
+    # InnoDB 二级索引叶子节点带主键，(handle_by) 索引即 (handle_by, fund_id)，
+    # 各支的游标条件和排序在索引内完成；不加索引提示，交给优化器选择
+    query = f"""
+        SELECT f.fund_id, f.handle_by, f.order_id, f.customer_id, CAST(f.amount AS DOUBLE) AS amount,
+               u.name AS handler_name, u.department
+        FROM ({union_query}) AS candidates
+        JOIN financial_funds f ON f.fund_id = candidates.fund_id
+        JOIN users u ON f.handle_by = u.id
+        ORDER BY f.fund_id {'DESC' if descending else 'ASC'}
+        LIMIT %s
+    """
 
-    return all_results, total_count
+    params.append(page_size)
+    row_cursor = row_cursor or cursor
+    row_cursor.execute(query, tuple(params))
+    return row_cursor.fetchall(), total_count
 
-def smart_pagination_service(supervisor_id: int, page: int = 1, page_size: int = 20,
-                           sort_by: str = "fund_id", sort_order: str = "ASC") -> Dict[str, Any]:
+def smart_pagination_service(supervisor_id: int, cursor_fund_id: Optional[int] = None, page_size: int = 20,
+                           sort_order: str = "ASC") -> Dict[str, Any]:
     """
     智能分页服务 - 集成完整的分页逻辑
+
+    cursor_fund_id 为上一页返回的 next_cursor，第一页传 None
     """
     conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        # 本页记录按列别名直接读成响应所需的字典
+        row_cursor = conn.cursor(dictionary=True)
 
         total_start_time = time.time()
 
-        print(f"=== 智能分页查询: 用户{supervisor_id}, 第{page}页 ===")
+        print(f"=== 智能分页查询: 用户{supervisor_id}, 游标 {cursor_fund_id} ===")
 
-        # 步骤 1-3: 获取权限ID (这部分保持快速)
+        # 步骤 1-3: 获取权限ID (同一 supervisor 翻页时命中缓存)
         step_start = time.time()
-        subordinate_ids = get_subordinate_ids(cursor, supervisor_id)
-        if supervisor_id not in subordinate_ids:
-            subordinate_ids.append(supervisor_id)
-
-        order_ids = get_order_ids_for_users(cursor, subordinate_ids)
-        customer_ids = get_customer_ids_for_users(cursor, subordinate_ids)
+        subordinate_ids, order_ids, customer_ids = get_permission_scope(cursor, supervisor_id)
 
         permissions_time = time.time() - step_start
         print(f"权限查询: {len(subordinate_ids)} 用户, {len(order_ids)} 订单, {len(customer_ids)} 客户 ({permissions_time:.4f}s)")
 
-        # 步骤 4: 优化分页查询
+        # 步骤 4: 优化分页查询（大的ID集合在服务端由 user_hierarchy 连接得出）
         step_start = time.time()
         results, total_count = get_financial_funds_optimized_pagination(
             cursor, subordinate_ids, order_ids, customer_ids,
-            page=page, page_size=page_size, sort_by=sort_by, sort_order=sort_order,
-            estimate_total=(page == 1)  # 只在第一页估算总数
+            cursor_fund_id=cursor_fund_id, page_size=page_size, sort_order=sort_order,
+            estimate_total=(cursor_fund_id is None),  # 只在第一页估算总数
+            supervisor_id=supervisor_id,
+            row_cursor=row_cursor
         )
         pagination_time = time.time() - step_start
 
         total_time = time.time() - total_start_time
 
-        # 计算分页信息
+        # 计算分页信息：取满一页才可能还有下一页
         total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
-        has_next = page < total_pages
-        has_prev = page > 1
+        next_cursor = results[-1]["fund_id"] if len(results) == page_size else None
 
         response = {
-            "data": [
-                {
-                    "fund_id": row[0],
-                    "handle_by": row[1],
-                    "order_id": row[2],
-                    "customer_id": row[3],
-                    "amount": float(row[4]),
-                    "handler_name": row[5],
-                    "department": row[6]
-                } for row in results
-            ],
+            "data": results,
             "pagination": {
-                "page": page,
+                "cursor": cursor_fund_id,
+                "next_cursor": next_cursor,
                 "page_size": page_size,
                 "total_count": total_count,
                 "total_pages": total_pages,
-                "has_next": has_next,
-                "has_prev": has_prev
+                "has_next": next_cursor is not None,
+                "has_prev": cursor_fund_id is not None
             },
             "performance": {
                 "permissions_time": round(permissions_time, 4),
@@ -310,28 +334,23 @@ def test_optimized_pagination():
 
     print("=== 测试优化分页性能 ===")
 
-    # 测试第1页
-    result1 = smart_pagination_service(supervisor_id, page=1, page_size=20)
-    if "error" not in result1:
-        print(f"第1页: {len(result1['data'])} 条记录")
-        print(f"性能: {result1['performance']}")
-        print(f"分页: {result1['pagination']}")
-
-    print("\n" + "="*50)
-
-    # 测试第5页
-    result5 = smart_pagination_service(supervisor_id, page=5, page_size=20)
-    if "error" not in result5:
-        print(f"第5页: {len(result5['data'])} 条记录")
-        print(f"性能: {result5['performance']}")
+    # 沿 next_cursor 依次翻到第10页，打印第1、5、10页
+    cursor_fund_id = None
+    for page in range(1, 11):
+        result = smart_pagination_service(supervisor_id, cursor_fund_id=cursor_fund_id, page_size=20)
+        if "error" in result:
+            break
 
-    print("\n" + "="*50)
+        if page in (1, 5, 10):
+            print(f"第{page}页: {len(result['data'])} 条记录")
+            print(f"性能: {result['performance']}")
+            if page == 1:
+                print(f"分页: {result['pagination']}")
+            print("\n" + "="*50)
 
-    # 测试第10页
-    result10 = smart_pagination_service(supervisor_id, page=10, page_size=20)
-    if "error" not in result10:
-        print(f"第10页: {len(result10['data'])} 条记录")
-        print(f"性能: {result10['performance']}")
+        cursor_fund_id = result['pagination']['next_cursor']
+        if cursor_fund_id is None:
+            break
 
 def main():
     """主函数"""
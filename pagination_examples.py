@@ -3,6 +3,7 @@ import os
 import time
 import argparse
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 from prettytable import PrettyTable
 
@@ -18,29 +19,65 @@ config = {
     'database': os.getenv('DB_NAME_V2', 'finance')
 }
 
+# 各分页查询共用的连接池，第一次借用连接时创建
+POOL_SIZE = 10
+_pool = None
+
 def connect_db():
-    """连接数据库"""
+    """从连接池借用连接，close()即归还，不再每次查询都重新建立TCP连接和认证"""
+    global _pool
     try:
-        conn = mysql.connector.connect(**config)
-        return conn
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(pool_name="fin", pool_size=POOL_SIZE, **config)
+        return _pool.get_connection()
     except mysql.connector.Error as e:
         print(f"数据库连接失败: {e}")
         return None
 
-def paginate_users(page=1, page_size=10, role=None, department=None):
+# 过滤条件下的总数缓存：(count_query, params) -> (计算时间, total)
+TOTAL_CACHE_TTL_SECONDS = 60
+_total_cache = {}
+
+def count_rows(cursor, count_query, params, table=None):
     """
-    用户分页查询
-    :param page: 页码（从1开始）
+    查询总记录数
+    :param table: 无过滤条件时传入表名，直接读取information_schema中的估算行数，不做COUNT(*)扫描
+    :return: 总记录数；带过滤条件的结果按参数缓存TOTAL_CACHE_TTL_SECONDS秒
+    """
+    if table:
+        cursor.execute(
+            "SELECT TABLE_ROWS as total FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+            (config['database'], table)
+        )
+        row = cursor.fetchone()
+        return (row[0] if row else None) or 0
+    
+    key = (count_query, tuple(params))
+    cached = _total_cache.get(key)
+    now = time.time()
+    if cached and now - cached[0] < TOTAL_CACHE_TTL_SECONDS:
+        return cached[1]
+    
+    cursor.execute(count_query, params)
+    total = cursor.fetchone()[0]
+    _total_cache[key] = (now, total)
+    return total
+
+def paginate_users(last_id=None, page_size=10, role=None, department=None, total=None):
+    """
+    用户分页查询（键集分页：从上一页最后一个id之后继续读取，不使用OFFSET）
+    :param last_id: 上一页最后一条记录的id，None表示第一页
     :param page_size: 每页记录数
     :param role: 可选，按角色筛选
     :param department: 可选，按部门筛选
-    :return: 元组 (总记录数, 当前页数据)
+    :param total: 可选，上一页返回的总记录数，传入后不再重新计数
+    :return: 元组 (总记录数, 列名, 当前页数据（元组）, 下一页的last_id；没有下一页时为None)
     """
     conn = connect_db()
     if not conn:
-        return 0, []
+        return 0, (), [], None
     
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     # 构建WHERE子句
     where_clause = ""
@@ -57,44 +94,51 @@ def paginate_users(page=1, page_size=10, role=None, department=None):
             where_clause = "WHERE department = %s"
         params.append(department)
     
-    # 查询总记录数
-    count_query = f"SELECT COUNT(*) as total FROM users {where_clause}"
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    # 查询总记录数（传入上一页返回的total时跳过）
+    if total is None:
+        count_query = f"SELECT COUNT(*) as total FROM users {where_clause}"
+        total = count_rows(cursor, count_query, params, table=None if where_clause else "users")
     
     # 分页查询数据
-    offset = (page - 1) * page_size
+    if last_id is not None:
+        where_clause += " AND id > %s" if where_clause else "WHERE id > %s"
+        params.append(last_id)
+    
     query = f"""
     SELECT id, name, role, department, parent_id
     FROM users {where_clause}
     ORDER BY id
-    LIMIT %s OFFSET %s
+    LIMIT %s
     """
     
-    params.extend([page_size, offset])
+    params.append(page_size)
     cursor.execute(query, params)
     results = cursor.fetchall()
+    columns = cursor.column_names
     
     cursor.close()
     conn.close()
     
-    return total, results
+    next_id = results[-1][0] if len(results) == page_size else None
+    return total, columns, results, next_id
 
-def paginate_financial_funds(page=1, page_size=10, min_amount=None, max_amount=None, user_id=None):
+def paginate_financial_funds(last_id=None, page_size=10, min_amount=None, max_amount=None, user_id=None,
+                             total=None):
     """
-    财务资金分页查询
-    :param page: 页码（从1开始）
+    财务资金分页查询（键集分页，按fund_id向后读取）
+    :param last_id: 上一页最后一条记录的fund_id，None表示第一页
     :param page_size: 每页记录数
     :param min_amount: 可选，最小金额
     :param max_amount: 可选，最大金额
     :param user_id: 可选，处理人ID
-    :return: 元组 (总记录数, 当前页数据)
+    :param total: 可选，上一页返回的总记录数，传入后不再重新计数
+    :return: 元组 (总记录数, 列名, 当前页数据（元组）, 下一页的last_id；没有下一页时为None)
     """
     conn = connect_db()
     if not conn:
-        return 0, []
+        return 0, (), [], None
     
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     # 构建WHERE子句
     where_clause = ""
@@ -118,42 +162,48 @@ def paginate_financial_funds(page=1, page_size=10, min_amount=None, max_amount=N
             where_clause = "WHERE handle_by = %s"
         params.append(user_id)
     
-    # 查询总记录数
-    count_query = f"SELECT COUNT(*) as total FROM financial_funds {where_clause}"
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    # 查询总记录数（传入上一页返回的total时跳过）
+    if total is None:
+        count_query = f"SELECT COUNT(*) as total FROM financial_funds {where_clause}"
+        total = count_rows(cursor, count_query, params, table=None if where_clause else "financial_funds")
     
     # 分页查询数据
-    offset = (page - 1) * page_size
+    if last_id is not None:
+        where_clause += " AND fund_id > %s" if where_clause else "WHERE fund_id > %s"
+        params.append(last_id)
+    
     query = f"""
     SELECT fund_id, handle_by, order_id, customer_id, amount
     FROM financial_funds {where_clause}
     ORDER BY fund_id
-    LIMIT %s OFFSET %s
+    LIMIT %s
     """
     
-    params.extend([page_size, offset])
+    params.append(page_size)
     cursor.execute(query, params)
     results = cursor.fetchall()
+    columns = cursor.column_names
     
     cursor.close()
     conn.close()
     
-    return total, results
+    next_id = results[-1][0] if len(results) == page_size else None
+    return total, columns, results, next_id
 
-def paginate_customer_orders(page=1, page_size=10, customer_id=None):
+def paginate_customer_orders(last_key=None, page_size=10, customer_id=None, total=None):
     """
-    客户订单关联查询（多表JOIN）
-    :param page: 页码（从1开始）
+    客户订单关联查询（多表JOIN + 延迟关联，按 (customer_id, order_id) 行值比较做键集分页）
+    :param last_key: 上一页最后一条记录的 (customer_id, order_id)，None表示第一页
     :param page_size: 每页记录数
     :param customer_id: 可选，客户ID
-    :return: 元组 (总记录数, 当前页数据)
+    :param total: 可选，上一页返回的总记录数，传入后不再重新计数
+    :return: 元组 (总记录数, 列名, 当前页数据（元组）, 下一页的last_key；没有下一页时为None)
     """
     conn = connect_db()
     if not conn:
-        return 0, []
+        return 0, (), [], None
     
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     # 构建WHERE子句
     where_clause = ""
@@ -163,51 +213,67 @@ def paginate_customer_orders(page=1, page_size=10, customer_id=None):
         where_clause = "WHERE c.customer_id = %s"
         params.append(customer_id)
     
-    # 查询总记录数
-    count_query = f"""
-    SELECT COUNT(*) as total 
-    FROM customers c
-    JOIN orders o ON c.admin_user_id = o.user_id
-    {where_clause}
-    """
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    # 查询总记录数（传入上一页返回的total时跳过）
+    if total is None:
+        count_query = f"""
+        SELECT COUNT(*) as total 
+        FROM customers c
+        JOIN orders o ON c.admin_user_id = o.user_id
+        {where_clause}
+        """
+        total = count_rows(cursor, count_query, params)
     
     # 分页查询数据
-    offset = (page - 1) * page_size
+    if last_key is not None:
+        seek = "(c.customer_id, o.order_id) > (%s, %s)"
+        where_clause += f" AND {seek}" if where_clause else f"WHERE {seek}"
+        params.extend(last_key)
+    
+    # 延迟关联：内层只按主键翻出本页的 (customer_id, order_id)，外层再回表取其他列，
+    # 回表和取宽列只发生在page_size行上
     query = f"""
     SELECT c.customer_id, o.order_id, o.user_id, u.name as user_name
-    FROM customers c
-    JOIN orders o ON c.admin_user_id = o.user_id
+    FROM (
+        SELECT c.customer_id, o.order_id
+        FROM customers c
+        JOIN orders o ON c.admin_user_id = o.user_id
+        JOIN users u ON o.user_id = u.id
+        {where_clause}
+        ORDER BY c.customer_id, o.order_id
+        LIMIT %s
+    ) p
+    JOIN customers c ON c.customer_id = p.customer_id
+    JOIN orders o ON o.order_id = p.order_id
     JOIN users u ON o.user_id = u.id
-    {where_clause}
-    ORDER BY c.customer_id, o.order_id
-    LIMIT %s OFFSET %s
+    ORDER BY p.customer_id, p.order_id
     """
     
-    params.extend([page_size, offset])
+    params.append(page_size)
     cursor.execute(query, params)
     results = cursor.fetchall()
+    columns = cursor.column_names
     
     cursor.close()
     conn.close()
     
-    return total, results
+    next_key = (results[-1][0], results[-1][1]) if len(results) == page_size else None
+    return total, columns, results, next_key
 
-def paginate_complex_report(page=1, page_size=10, min_amount=None, department=None):
+def paginate_complex_report(last_id=None, page_size=10, min_amount=None, department=None, total=None):
     """
-    复杂报表查询示例（多表JOIN + 条件过滤）
-    :param page: 页码（从1开始）
+    复杂报表查询示例（多表JOIN + 条件过滤 + 延迟关联，按f.fund_id做键集分页）
+    :param last_id: 上一页最后一条记录的fund_id，None表示第一页
     :param page_size: 每页记录数
     :param min_amount: 可选，最小金额
     :param department: 可选，部门
-    :return: 元组 (总记录数, 当前页数据)
+    :param total: 可选，上一页返回的总记录数，传入后不再重新计数
+    :return: 元组 (总记录数, 列名, 当前页数据（元组）, 下一页的last_id；没有下一页时为None)
     """
     conn = connect_db()
     if not conn:
-        return 0, []
+        return 0, (), [], None
     
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     # 构建WHERE子句
     where_clause = ""
@@ -224,20 +290,24 @@ def paginate_complex_report(page=1, page_size=10, min_amount=None, department=No
             where_clause = "WHERE u.department = %s"
         params.append(department)
     
-    # 查询总记录数
-    count_query = f"""
-    SELECT COUNT(*) as total 
-    FROM financial_funds f
-    JOIN users u ON f.handle_by = u.id
-    JOIN customers c ON f.customer_id = c.customer_id
-    JOIN orders o ON f.order_id = o.order_id
-    {where_clause}
-    """
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    # 查询总记录数（传入上一页返回的total时跳过）
+    if total is None:
+        count_query = f"""
+        SELECT COUNT(*) as total 
+        FROM financial_funds f
+        JOIN users u ON f.handle_by = u.id
+        JOIN customers c ON f.customer_id = c.customer_id
+        JOIN orders o ON f.order_id = o.order_id
+        {where_clause}
+        """
+        total = count_rows(cursor, count_query, params)
     
     # 分页查询数据
-    offset = (page - 1) * page_size
+    if last_id is not None:
+        where_clause += " AND f.fund_id > %s" if where_clause else "WHERE f.fund_id > %s"
+        params.append(last_id)
+    
+    # 延迟关联：内层只翻出本页的fund_id，外层再按主键回表取各表的列
     query = f"""
     SELECT 
         f.fund_id, 
@@ -247,51 +317,67 @@ def paginate_complex_report(page=1, page_size=10, min_amount=None, department=No
         u.department, 
         c.customer_id, 
         o.order_id
-    FROM financial_funds f
+    FROM (
+        SELECT f.fund_id
+        FROM financial_funds f
+        JOIN users u ON f.handle_by = u.id
+        JOIN customers c ON f.customer_id = c.customer_id
+        JOIN orders o ON f.order_id = o.order_id
+        {where_clause}
+        ORDER BY f.fund_id
+        LIMIT %s
+    ) p
+    JOIN financial_funds f ON f.fund_id = p.fund_id
     JOIN users u ON f.handle_by = u.id
     JOIN customers c ON f.customer_id = c.customer_id
     JOIN orders o ON f.order_id = o.order_id
-    {where_clause}
-    ORDER BY f.fund_id
-    LIMIT %s OFFSET %s
+    ORDER BY p.fund_id
     """
     
-    params.extend([page_size, offset])
+    params.append(page_size)
     cursor.execute(query, params)
     results = cursor.fetchall()
+    columns = cursor.column_names
     
     cursor.close()
     conn.close()
     
-    return total, results
+    next_id = results[-1][0] if len(results) == page_size else None
+    return total, columns, results, next_id
 
-def paginate_user_subordinates(user_id, page=1, page_size=10):
+def paginate_user_subordinates(user_id, last_key=None, page_size=10, total=None):
     """
-    查询用户的所有下级（利用user_hierarchy表）
+    查询用户的所有下级（利用user_hierarchy表，按 (depth, id) 行值比较做键集分页）
     :param user_id: 用户ID
-    :param page: 页码（从1开始）
+    :param last_key: 上一页最后一条记录的 (level, id)，None表示第一页
     :param page_size: 每页记录数
-    :return: 元组 (总记录数, 当前页数据)
+    :param total: 可选，上一页返回的总记录数，传入后不再重新计数
+    :return: 元组 (总记录数, 列名, 当前页数据（元组）, 下一页的last_key；没有下一页时为None)
     """
     conn = connect_db()
     if not conn:
-        return 0, []
+        return 0, (), [], None
     
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
-    # 查询总记录数
-    count_query = """
-    SELECT COUNT(*) as total 
-    FROM user_hierarchy h
-    JOIN users u ON h.subordinate_id = u.id
-    WHERE h.user_id = %s AND h.depth > 0
-    """
-    cursor.execute(count_query, [user_id])
-    total = cursor.fetchone()['total']
+    # 查询总记录数（传入上一页返回的total时跳过）
+    if total is None:
+        count_query = """
+        SELECT COUNT(*) as total 
+        FROM user_hierarchy h
+        JOIN users u ON h.subordinate_id = u.id
+        WHERE h.user_id = %s AND h.depth > 0
+        """
+        total = count_rows(cursor, count_query, [user_id])
     
     # 分页查询数据
-    offset = (page - 1) * page_size
-    query = """
+    seek_clause = ""
+    params = [user_id]
+    if last_key is not None:
+        seek_clause = "AND (h.depth, u.id) > (%s, %s)"
+        params.extend(last_key)
+    
+    query = f"""
     SELECT 
         u.id, 
         u.name, 
@@ -300,44 +386,55 @@ def paginate_user_subordinates(user_id, page=1, page_size=10):
         h.depth as level
     FROM user_hierarchy h
     JOIN users u ON h.subordinate_id = u.id
-    WHERE h.user_id = %s AND h.depth > 0
+    WHERE h.user_id = %s AND h.depth > 0 {seek_clause}
     ORDER BY h.depth, u.id
-    LIMIT %s OFFSET %s
+    LIMIT %s
     """
     
-    cursor.execute(query, [user_id, page_size, offset])
+    params.append(page_size)
+    cursor.execute(query, params)
     results = cursor.fetchall()
+    columns = cursor.column_names
     
     cursor.close()
     conn.close()
     
-    return total, results
+    next_key = (results[-1][4], results[-1][0]) if len(results) == page_size else None
+    return total, columns, results, next_key
 
-def display_results(title, results, total, page, page_size):
-    """格式化显示结果"""
+def display_results(title, columns, results, total, page, page_size, next_key=None):
+    """格式化显示结果，columns为结果元组对应的列名，next_key为下一页的 --last_id 参数"""
     if not results:
         print(f"{title}: 没有找到记录")
         return
     
     # 创建表格
     table = PrettyTable()
-    table.field_names = results[0].keys()
+    table.field_names = columns
     
     for result in results:
-        table.add_row(result.values())
+        table.add_row(result)
     
     total_pages = (total + page_size - 1) // page_size
     
     print(f"\n=== {title} ===")
     print(f"总记录数: {total}, 当前页: {page}/{total_pages}, 每页显示: {page_size}")
     print(table)
+    
+    if next_key is not None:
+        keys = next_key if isinstance(next_key, tuple) else (next_key,)
+        print(f"下一页: --page {page + 1} --last_id {' '.join(str(k) for k in keys)} --total {total}")
 
 def main():
     parser = argparse.ArgumentParser(description="财务权限系统分页查询示例")
     parser.add_argument("--query", type=str, choices=[
         "users", "funds", "customer_orders", "complex", "subordinates"
     ], default="users", help="要执行的查询类型")
-    parser.add_argument("--page", type=int, default=1, help="页码")
+    parser.add_argument("--page", type=int, default=1, help="页码（仅用于显示，翻页由 --last_id 决定）")
+    parser.add_argument("--last_id", type=int, nargs="+",
+                        help="上一页最后一条记录的键：单列键传一个值，customer_orders传 customer_id order_id，"
+                             "subordinates传 level id")
+    parser.add_argument("--total", type=int, help="上一页返回的总记录数，传入后跳过计数查询")
     parser.add_argument("--page_size", type=int, default=10, help="每页记录数")
     parser.add_argument("--role", type=str, help="用户角色 (users查询)")
     parser.add_argument("--department", type=str, help="部门 (users或complex查询)")
@@ -348,53 +445,61 @@ def main():
     
     args = parser.parse_args()
     
+    last_id = args.last_id[0] if args.last_id else None
+    last_key = tuple(args.last_id) if args.last_id else None
+    
     if args.query == "users":
-        total, results = paginate_users(
-            page=args.page, 
+        total, columns, results, next_key = paginate_users(
+            last_id=last_id, 
             page_size=args.page_size, 
+            total=args.total, 
             role=args.role, 
             department=args.department
         )
-        display_results("用户列表", results, total, args.page, args.page_size)
+        display_results("用户列表", columns, results, total, args.page, args.page_size, next_key)
     
     elif args.query == "funds":
-        total, results = paginate_financial_funds(
-            page=args.page, 
+        total, columns, results, next_key = paginate_financial_funds(
+            last_id=last_id, 
             page_size=args.page_size, 
+            total=args.total, 
             min_amount=args.min_amount, 
             max_amount=args.max_amount,
             user_id=args.user_id
         )
-        display_results("财务资金列表", results, total, args.page, args.page_size)
+        display_results("财务资金列表", columns, results, total, args.page, args.page_size, next_key)
     
     elif args.query == "customer_orders":
-        total, results = paginate_customer_orders(
-            page=args.page, 
+        total, columns, results, next_key = paginate_customer_orders(
+            last_key=last_key, 
             page_size=args.page_size, 
+            total=args.total, 
             customer_id=args.customer_id
         )
-        display_results("客户订单关联", results, total, args.page, args.page_size)
+        display_results("客户订单关联", columns, results, total, args.page, args.page_size, next_key)
     
     elif args.query == "complex":
-        total, results = paginate_complex_report(
-            page=args.page, 
+        total, columns, results, next_key = paginate_complex_report(
+            last_id=last_id, 
             page_size=args.page_size, 
+            total=args.total, 
             min_amount=args.min_amount, 
             department=args.department
         )
-        display_results("复杂财务报表", results, total, args.page, args.page_size)
+        display_results("复杂财务报表", columns, results, total, args.page, args.page_size, next_key)
     
     elif args.query == "subordinates":
         if not args.user_id:
             print("错误: 查询下属必须指定 --user_id 参数")
             return
         
-        total, results = paginate_user_subordinates(
+        total, columns, results, next_key = paginate_user_subordinates(
             user_id=args.user_id,
-            page=args.page, 
-            page_size=args.page_size
+            last_key=last_key, 
+            page_size=args.page_size,
+            total=args.total
         )
-        display_results(f"用户 {args.user_id} 的下属列表", results, total, args.page, args.page_size)
+        display_results(f"用户 {args.user_id} 的下属列表", columns, results, total, args.page, args.page_size, next_key)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
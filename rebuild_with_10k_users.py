@@ -1,22 +1,30 @@
 import os
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 import time
 
 # Load environment variables
 load_dotenv()
 
+# 各重建步骤共用的连接池，第一次获取连接时创建
+POOL_SIZE = 10
+_pool = None
+
 def get_db_connection():
-    """获取数据库连接"""
-    config = {
-        'host': os.getenv('DB_HOST_V2', '127.0.0.1'),
-        'port': int(os.getenv('DB_PORT_V2', '3306')),
-        'user': os.getenv('DB_USER_V2', 'root'),
-        'password': os.getenv('DB_PASSWORD_V2', '123456'),
-        'database': os.getenv('DB_NAME_V2', 'finance'),
-        'autocommit': True
-    }
-    return mysql.connector.connect(**config)
+    """从连接池获取数据库连接，close()即归还"""
+    global _pool
+    if _pool is None:
+        config = {
+            'host': os.getenv('DB_HOST_V2', '127.0.0.1'),
+            'port': int(os.getenv('DB_PORT_V2', '3306')),
+            'user': os.getenv('DB_USER_V2', 'root'),
+            'password': os.getenv('DB_PASSWORD_V2', '123456'),
+            'database': os.getenv('DB_NAME_V2', 'finance'),
+            'autocommit': True
+        }
+        _pool = pooling.MySQLConnectionPool(pool_name="fin", pool_size=POOL_SIZE, **config)
+    return _pool.get_connection()
 
 def cleanup_users_table():
     """清理users表，只保留前1万个用户"""
@@ -117,42 +125,33 @@ def build_complete_hierarchy():
         print("2. 构建完整层级关系...")
         
         # 找到所有根用户
-        cursor.execute("SELECT id FROM users WHERE parent_id IS NULL")
-        root_users = [row[0] for row in cursor.fetchall()]
-        print(f"   发现 {len(root_users)} 个根用户")
-        
-        total_relationships = 0
+        cursor.execute("SELECT COUNT(*) FROM users WHERE parent_id IS NULL")
+        root_count = cursor.fetchone()[0]
+        print(f"   发现 {root_count} 个根用户")
         
-        # 为每个根用户构建层级树
-        for root_id in root_users:
-            print(f"   处理用户 {root_id} 的层级树...")
-            
-            # 使用递归CTE一次性插入所有层级关系
-            cursor.execute("""
-                INSERT INTO user_hierarchy (user_id, subordinate_id, depth)
-                WITH RECURSIVE hierarchy_tree AS (
-                    -- 起始：找到当前根用户的直接下属
-                    SELECT %s as supervisor_id, id as subordinate_id, 1 as depth
-                    FROM users 
-                    WHERE parent_id = %s
-                    
-                    UNION ALL
-                    
-                    -- 递归：找到下属的下属
-                    SELECT ht.supervisor_id, u.id, ht.depth + 1
-                    FROM hierarchy_tree ht
-                    JOIN users u ON u.parent_id = ht.subordinate_id
-                    WHERE ht.depth < 10  -- 限制最大深度为10
-                )
-                SELECT supervisor_id, subordinate_id, depth
-                FROM hierarchy_tree
-            """, (root_id, root_id))
-            
-            inserted = cursor.rowcount
-            total_relationships += inserted
-            if inserted > 0:
-                print(f"     插入了 {inserted} 条关系")
+        # 一条递归CTE以所有根用户为起点，一次性插入全部根用户的层级关系
+        cursor.execute("""
+            INSERT INTO user_hierarchy (user_id, subordinate_id, depth)
+            WITH RECURSIVE hierarchy_tree AS (
+                -- 起始：所有根用户本身
+                SELECT id as supervisor_id, id as subordinate_id, 0 as depth
+                FROM users 
+                WHERE parent_id IS NULL
+                
+                UNION ALL
+                
+                -- 递归：找到下属的下属
+                SELECT ht.supervisor_id, u.id, ht.depth + 1
+                FROM hierarchy_tree ht
+                JOIN users u ON u.parent_id = ht.subordinate_id
+                WHERE ht.depth < 10  -- 限制最大深度为10
+            )
+            SELECT supervisor_id, subordinate_id, depth
+            FROM hierarchy_tree
+            WHERE depth > 0
+        """)
         
+        total_relationships = cursor.rowcount
         print(f"   总共插入 {total_relationships:,} 条层级关系")
         
         # 3. 检查结果
@@ -190,23 +189,34 @@ def update_financial_data():
     try:
         print("\n=== 更新财务数据 ===")
         
-        # 1. 检查当前财务数据中有多少handle_by不在新用户范围内
+        # 1. 给现有用户编号一次，之后每条无效记录按 fund_id % 用户数 一次JOIN取到处理人，
+        #    不再为每一行执行一次 ORDER BY RAND() 的全表排序
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS u_pick")
         cursor.execute("""
-            SELECT COUNT(*) FROM financial_funds 
-            WHERE handle_by NOT IN (SELECT id FROM users)
+            CREATE TEMPORARY TABLE u_pick (
+                rn INT NOT NULL PRIMARY KEY,
+                id INT NOT NULL
+            )
         """)
-        invalid_funds = cursor.fetchone()[0]
-        print(f"1. 发现 {invalid_funds:,} 条财务记录的handle_by不在用户范围内")
-        
-        if invalid_funds > 0:
-            # 2. 更新这些记录，随机分配给现有用户
-            print("2. 更新无效的handle_by...")
-            cursor.execute("""
-                UPDATE financial_funds 
-                SET handle_by = (SELECT id FROM users ORDER BY RAND() LIMIT 1)
-                WHERE handle_by NOT IN (SELECT id FROM users)
-            """)
-            print(f"   已更新 {cursor.rowcount:,} 条记录")
+        cursor.execute("""
+            INSERT INTO u_pick (rn, id)
+            SELECT ROW_NUMBER() OVER (ORDER BY id), id FROM users
+        """)
+        user_count = cursor.rowcount
+        
+        # 2. handle_by不在新用户范围内的记录用反连接找出，在同一条UPDATE中重新分配，
+        #    不再先COUNT再UPDATE扫描两遍；临时表在同一条语句中不能打开两次，用户数作为参数传入
+        print("1. 更新不在用户范围内的handle_by...")
+        cursor.execute("""
+            UPDATE financial_funds f
+            LEFT JOIN users u ON u.id = f.handle_by
+            JOIN u_pick p ON p.rn = MOD(f.fund_id, %s) + 1
+            SET f.handle_by = p.id
+            WHERE u.id IS NULL
+        """, (user_count,))
+        print(f"2. 发现并更新 {cursor.rowcount:,} 条handle_by不在用户范围内的财务记录")
+        
+        cursor.execute("DROP TEMPORARY TABLE u_pick")
         
         # 3. 检查结果
         cursor.execute("SELECT COUNT(*) FROM financial_funds")
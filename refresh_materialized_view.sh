@@ -62,9 +62,7 @@ UNION
     JOIN financial_funds f ON c.customer_id = f.customer_id
     JOIN users u ON f.handle_by = u.id
     WHERE h.depth >= 0
-)
-
-UPDATE mv_supervisor_financial SET last_updated = NOW();
+);
 
 SELECT COUNT(*) FROM mv_supervisor_financial;
 EOF